@@ -0,0 +1,331 @@
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from synthetic_corpus import make_pages, make_queries, make_transcript, write_pdf
+
+# Offline, repeatable benchmarks. Ollama is replaced by stub_ollama (fixed
+# latency and token rate) and Milvus by stub_milvus unless --milvus lite (Milvus
+# Lite files) or --milvus numpy (the in-process index of numpy_index) is given; the corpus is generated from fixed seeds. Results are written as JSON
+# so runs can be compared across commits.
+
+BENCHMARKS = ("transcript_ingestion", "ingest_data", "pdf_ingestion", "retrieval", "vector_search",
+              "summary", "flashcards", "chapters", "startup")
+
+# 'zeta.py <command> --help', 'chat' up to its prompt and 'chapters' must each come back
+# within this, or the run fails
+STARTUP_BUDGET_SECONDS = 1.0
+
+
+def percentile(sorted_values, fraction):
+    """
+    Linearly interpolated percentile of already sorted values.
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies, items, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "runs": len(latencies),
+        "items": items,
+        "seconds": round(elapsed, 4),
+        "throughput_per_sec": round(items / elapsed, 3) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 3),
+    }
+
+
+def measure(run, inputs, warmup=1, quiet=True):
+    """
+    Call 'run(input)' for every input and time each call. 'run' returns the
+    number of items it processed (documents, chunks, queries, ...), which is
+    what the throughput counts. The first 'warmup' inputs are not recorded.
+    """
+    latencies, items = [], 0
+    started = None
+    for index, value in enumerate(inputs):
+        if index == warmup:
+            started = time.perf_counter()
+        call_started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            processed = run(value)
+        if index >= warmup:
+            latencies.append(time.perf_counter() - call_started)
+            items += processed
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    return summarize(latencies, items, elapsed)
+
+
+class BenchmarkContext:
+    """
+    Working directory, databases and shared objects of one benchmark run.
+    """
+
+    def __init__(self, workdir, iterations, warmup, quiet, db_suffix=".db"):
+        self.workdir = workdir
+        self.iterations = iterations
+        self.warmup = warmup
+        self.quiet = quiet
+        self.transcript_db = os.path.join(workdir, f"transcripts{db_suffix}")
+        self.docs_db = os.path.join(workdir, f"docs{db_suffix}")
+        self._rag = None
+
+    def path(self, name):
+        return os.path.join(self.workdir, name)
+
+    def seeds(self):
+        return range(self.warmup + self.iterations)
+
+    @property
+    def rag(self):
+        if self._rag is None:
+            from rag_with_chatbotp import RAGSystem
+            with contextlib.redirect_stdout(io.StringIO()) if self.quiet else contextlib.nullcontext():
+                self._rag = RAGSystem(db_path=self.docs_db, collection_name="bench_docs")
+        return self._rag
+
+    def measure(self, run, inputs, warmup=None):
+        return measure(run, inputs, self.warmup if warmup is None else warmup, self.quiet)
+
+
+def bench_transcript_ingestion(ctx):
+    # The ingestion path of 'milvus db RAG.py', one new lecture per run
+    module = importlib.import_module("milvus db RAG")
+
+    def run(seed):
+        segments = make_transcript(seed)
+        path = ctx.path(f"transcript_{seed}.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(segments, file)
+        module.ingest_transcription(path, db_path=ctx.transcript_db, collection_name="bench_transcripts")
+        return len(segments)
+
+    return ctx.measure(run, ctx.seeds())
+
+
+def bench_ingest_data(ctx):
+    def run(seed):
+        stats = ctx.rag.ingest_data(" ".join(make_pages(1000 + seed)), doc_id=f"text-{seed}")
+        return stats["added"]
+
+    return ctx.measure(run, ctx.seeds())
+
+
+def bench_pdf_ingestion(ctx):
+    paths = []
+    for seed in ctx.seeds():
+        paths.append(ctx.path(f"handout_{seed}.pdf"))
+        write_pdf(paths[-1], make_pages(2000 + seed))
+    return ctx.measure(lambda path: ctx.rag.ingest_pdf(path)["added"], paths)
+
+
+def _ensure_retrieval_corpus(ctx):
+    if not ctx.rag.manifest.documents(ctx.rag.collection_name):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for seed in range(3):
+                ctx.rag.ingest_data(" ".join(make_pages(1000 + seed)), doc_id=f"text-{seed}")
+
+
+def bench_retrieval(ctx):
+    _ensure_retrieval_corpus(ctx)
+    queries = make_queries(count=ctx.warmup + ctx.iterations * 10)
+
+    def run(query):
+        ctx.rag.retrieve_context(query)
+        return 1
+
+    return ctx.measure(run, queries)
+
+
+def bench_vector_search(ctx):
+    # The vector store alone: queries are embedded up front, then searched one by one
+    _ensure_retrieval_corpus(ctx)
+    vectors = ctx.rag.embedder.embed(make_queries(count=ctx.warmup + ctx.iterations * 10))
+
+    def run(vector):
+        ctx.rag.client.search(collection_name=ctx.rag.collection_name, data=[vector], limit=10, output_fields=["text"])
+        return 1
+
+    return ctx.measure(run, vectors)
+
+
+def bench_summary(ctx):
+    from summary import generate_summary_map_reduce
+
+    def run(seed):
+        segments = make_transcript(3000 + seed)
+        generate_summary_map_reduce(segments, token_budget=1000)
+        return len(segments)
+
+    return ctx.measure(run, ctx.seeds())
+
+
+def bench_flashcards(ctx):
+    from flash_cards import generate_flashcards_from_segments
+
+    def run(seed):
+        segments = make_transcript(4000 + seed)
+        generate_flashcards_from_segments(segments, window_tokens=500)
+        return len(segments)
+
+    return ctx.measure(run, ctx.seeds())
+
+
+def bench_chapters(ctx):
+    from chapter_generation import generate_chapters_from_collection
+    from collection_scan import iter_rows
+    from registry import get_vector_client
+    client = get_vector_client(ctx.transcript_db)
+    if not client.has_collection("bench_transcripts"):
+        bench_transcript_ingestion(ctx)
+    rows = sum(1 for _ in iter_rows(client, "bench_transcripts", []))
+
+    def run(_):
+        # A generator: consume it so the scan actually happens
+        for _ in generate_chapters_from_collection(client, "bench_transcripts"):
+            pass
+        return rows
+
+    return ctx.measure(run, ctx.seeds())
+
+
+# Runs a zeta.py command in a fresh interpreter, then fails if it left Whisper or torch loaded
+# ('--help' exits through SystemExit, which is fine)
+STARTUP_DRIVER = """
+import sys
+sys.path.insert(0, sys.argv.pop(1))
+import zeta
+command = sys.argv[1:]
+try:
+    zeta.main(command)
+except SystemExit as e:
+    if e.code:
+        raise
+loaded = [name for name in ("torch", "whisper") if name in sys.modules]
+if loaded:
+    sys.exit(f"'zeta.py {' '.join(command)}' imported {', '.join(loaded)}")
+"""
+
+
+def bench_startup(ctx):
+    # Fresh interpreter per run. '--help' of every command only imports its module and parses
+    # its options; 'chat' runs up to its first prompt (answered with 'exit') and 'chapters' to the
+    # end, both over a small NumPy index, so the lazy imports of a real start are covered too.
+    from zeta import COMMANDS
+    here = os.path.dirname(os.path.abspath(__file__))
+    store = ctx.path("startup.npvec")
+
+    def zeta(*args, stdin=None):
+        result = subprocess.run([sys.executable, "-c", STARTUP_DRIVER, here, *args], input=stdin, text=True,
+                                cwd=ctx.workdir, capture_output=True)
+        if result.returncode:
+            raise RuntimeError(f"'zeta.py {' '.join(args)}' failed:\n{result.stderr.strip()}")
+
+    # One lecture for chat and chapters to open, ingested through the chat command itself
+    transcript = ctx.path("startup_transcript.json")
+    with open(transcript, "w", encoding="utf-8") as file:
+        json.dump(make_transcript(5000), file)
+    zeta("chat", transcript, "--db-path", store, "--workers", "1", stdin="exit\n")
+
+    cases = {f"{command} --help": ([command, "--help"], None) for command in COMMANDS}
+    cases["chat"] = (["chat", "--db-path", store], "exit\n")
+    cases["chapters"] = (["chapters", "--db-path", store, "--output", ctx.path("startup_chapters.json")], None)
+    slowest = {}
+
+    def run(name):
+        args, stdin = cases[name]
+        started = time.perf_counter()
+        zeta(*args, stdin=stdin)
+        slowest[name] = max(slowest.get(name, 0.0), time.perf_counter() - started)
+        return 1
+
+    stats = ctx.measure(run, [name for _ in ctx.seeds() for name in cases], warmup=len(cases) * ctx.warmup)
+    stats["slowest_ms"] = {name: round(1000 * seconds, 3) for name, seconds in slowest.items()}
+    stats["budget_ms"] = 1000 * STARTUP_BUDGET_SECONDS
+    stats["within_budget"] = max(slowest.values()) <= STARTUP_BUDGET_SECONDS
+    return stats
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite and write the results as JSON.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Benchmarks to run (default: all)")
+    parser.add_argument("--iterations", type=int, default=5, help="Recorded runs per benchmark")
+    parser.add_argument("--warmup", type=int, default=1, help="Unrecorded runs before the recorded ones")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--milvus", choices=("stub", "lite", "numpy"), default="stub",
+                        help="In-memory stand-in, Milvus Lite files or the in-process NumPy index")
+    parser.add_argument("--ollama", default=None, help="URL of a real Ollama server (default: the local stub)")
+    parser.add_argument("--dimension", type=int, default=256, help="Stub embedding dimension")
+    parser.add_argument("--tokens", type=int, default=40, help="Stub tokens per generation")
+    parser.add_argument("--token-rate", type=float, default=2000.0, help="Stub tokens per second")
+    parser.add_argument("--first-token-latency", type=float, default=0.01, help="Stub seconds before the first token")
+    parser.add_argument("--embed-latency", type=float, default=0.002, help="Stub seconds per embedding request")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the benchmarked code")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="zeta_bench_")
+    # Must be set before anything opens the default embedding cache
+    os.environ["ZETA_EMBEDDING_CACHE"] = os.path.join(workdir, "embedding_cache.db")
+    if args.ollama:
+        os.environ["OLLAMA_HOST"] = args.ollama
+    else:
+        from stub_ollama import start_stub_server
+        stub = start_stub_server(dimension=args.dimension, tokens=args.tokens, token_rate=args.token_rate,
+                                 first_token_latency=args.first_token_latency, embed_latency=args.embed_latency)
+        os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{stub.server_port}"
+
+    ctx = BenchmarkContext(workdir, args.iterations, args.warmup, quiet=not args.verbose,
+                           db_suffix=".npvec" if args.milvus == "numpy" else ".db")
+    if args.milvus == "stub":
+        from registry import get_resource
+        from stub_milvus import StubMilvusClient
+        for db_path in (ctx.transcript_db, ctx.docs_db):
+            get_resource(("milvus", db_path), StubMilvusClient)
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"Running {name}...")
+        results[name] = globals()[f"bench_{name}"](ctx)
+        stats = results[name]
+        print(f"  {stats['throughput_per_sec']} items/s, p50 {stats['p50_ms']} ms, "
+              f"p95 {stats['p95_ms']} ms, p99 {stats['p99_ms']} ms")
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved to {args.output} (working files in {workdir})")
+    if not results.get("startup", {}).get("within_budget", True):
+        print(f"Startup over budget: {results['startup']['slowest_ms']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
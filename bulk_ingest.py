@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from glob import glob
+
+from chunking import chunk_pages, merge_transcript_segments
+from ingestion import ingest_document, save_ingestion_progress
+from pdf_extract import iter_pdf_pages
+from transcript_store import load_segments
+
+SUPPORTED_EXTENSIONS = (".pdf", ".json", ".jsonl", ".npz")
+
+
+def checkpoint_path_for(db_path):
+    return f"{db_path}.bulk_checkpoint.json"
+
+
+def discover_files(sources):
+    """
+    Expand directories (searched recursively) and glob patterns into a sorted
+    list of PDF and transcript (.json / .jsonl / .npz store) files.
+    """
+    files = set()
+    for source in sources:
+        if os.path.isdir(source):
+            matches = glob(os.path.join(source, "**", "*"), recursive=True)
+        else:
+            matches = glob(source, recursive=True)
+        files.update(
+            os.path.abspath(path) for path in matches
+            if os.path.isfile(path) and path.lower().endswith(SUPPORTED_EXTENSIONS)
+        )
+    return sorted(files)
+
+
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+class IngestionCheckpoint:
+    """
+    Files already ingested into each collection by a bulk run, with the size
+    and modification time they had at the time, saved as JSON every few files.
+    A rerun skips files that are unchanged since, so an interrupted import
+    resumes where it stopped.
+
+    Layout: {collection: {file path: {"signature", "chunks"}}}.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.collections = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.collections = json.load(file)
+            # Checkpoints of older versions were keyed by file only; start over rather than guess the collection
+            if any("signature" in entry for entry in self.collections.values()):
+                self.collections = {}
+
+    def is_done(self, collection_name, file_path, manifest):
+        """
+        True if 'file_path' is unchanged since it was ingested into the
+        collection, and the manifest still lists it there (a checkpoint that
+        outlived its collection never skips real work).
+        """
+        entry = self.collections.get(collection_name, {}).get(file_path)
+        return (entry is not None and entry["signature"] == file_signature(file_path)
+                and manifest.has_document(collection_name, file_path))
+
+    def mark_done(self, collection_name, file_path, signature, chunks):
+        self.collections.setdefault(collection_name, {})[file_path] = {"signature": signature, "chunks": chunks}
+
+    def forget_collection(self, collection_name):
+        self.collections.pop(collection_name, None)
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.collections, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def load_file_rows(file_path):
+    """
+    Extract and chunk one file into rows for ingest_document. PDF chunks keep
+    their pages; transcript chunks keep their timestamps.
+    """
+    if file_path.lower().endswith(".pdf"):
+        # Already running in a worker process, so extract the pages in-process
+        return list(chunk_pages(iter_pdf_pages(file_path, workers=1)))
+    segments = load_segments(file_path)
+    if not isinstance(segments, list) or not all(isinstance(segment, dict) and "text" in segment for segment in segments):
+        raise ValueError("not a transcription file (expected a list of segments with a 'text' key)")
+    return merge_transcript_segments(segments)
+
+
+def _prepare_file(file_path):
+    # The signature is taken before reading, so a file edited mid-run is picked up next time
+    signature = file_signature(file_path)
+    return signature, load_file_rows(file_path)
+
+
+def _report(label, files, chunks, started):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(f"{label}: {files} docs, {chunks} chunks in {elapsed:.1f}s "
+          f"({files / elapsed:.2f} docs/sec, {chunks / elapsed:.1f} chunks/sec)")
+
+
+def bulk_ingest(sources, client, collection_name, embedder, manifest, checkpoint_path,
+                workers=None, report_every=10, lexical_index=None, save_every=50):
+    """
+    Ingest every PDF and transcript under 'sources' (directories or glob patterns).
+
+    Extraction and chunking run on a pool of 'workers' processes, at most two
+    files per worker ahead of the embedder; each prepared file is embedded and
+    upserted with ingest_document (in the main process, which owns the Milvus
+    client) and then recorded in the checkpoint. The vector store is flushed
+    and the manifest and checkpoint written every 'save_every' files and at
+    the end, not after every file: all three grow with the import, so
+    rewriting them per file would make a large import quadratic. After a crash only the files since the last
+    save are ingested again, which is idempotent.
+
+    Returns:
+        Dict with the number of ingested, skipped and failed files and of chunks.
+    """
+    checkpoint = IngestionCheckpoint(checkpoint_path)
+    files = discover_files(sources)
+    todo = [path for path in files if not checkpoint.is_done(collection_name, path, manifest)]
+    stats = {"files": 0, "chunks": 0, "skipped": len(files) - len(todo), "failed": 0}
+    print(f"Found {len(files)} files, {stats['skipped']} already ingested, {len(todo)} to go.")
+    if not todo:
+        return stats
+
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    pending = {}
+    remaining = iter(todo)
+
+    def save_progress():
+        # Store and manifest first: a file must never be checkpointed without its chunks stored
+        save_ingestion_progress(client, collection_name, manifest)
+        checkpoint.save()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                # Keep the pool busy without preparing far ahead of the embedder
+                while len(pending) < workers * 2:
+                    file_path = next(remaining, None)
+                    if file_path is None:
+                        break
+                    pending[executor.submit(_prepare_file, file_path)] = file_path
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = pending.pop(future)
+                    try:
+                        signature, rows = future.result()
+                        ingest_document(client, collection_name, embedder, manifest, file_path, rows, lexical_index,
+                                        save=False)
+                    except Exception as e:
+                        print(f"Failed to ingest {file_path}: {e}")
+                        stats["failed"] += 1
+                        continue
+                    checkpoint.mark_done(collection_name, file_path, signature, len(rows))
+                    stats["files"] += 1
+                    stats["chunks"] += len(rows)
+                    if stats["files"] % save_every == 0:
+                        save_progress()
+                    if stats["files"] % report_every == 0:
+                        _report("Progress", stats["files"], stats["chunks"], started)
+    finally:
+        # Also on Ctrl-C, so the files finished so far are not redone
+        save_progress()
+
+    _report("Bulk ingestion done", stats["files"], stats["chunks"], started)
+    if stats["failed"]:
+        print(f"{stats['failed']} files failed; rerun to retry them.")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest PDFs and transcripts into the vector store without chatting.")
+    parser.add_argument("sources", nargs="+", help="Files, directories or glob patterns of PDFs and transcripts")
+    parser.add_argument("--workers", type=int, default=None, help="Number of extraction worker processes")
+    parser.add_argument("--db-path", default="./milvus_rag.db",
+                        help="Milvus Lite file or server URI, or a .npvec file for the in-process NumPy index")
+    parser.add_argument("--collection", default="my_rag_collection")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the collection and its checkpoint entries, then ingest every file again")
+    args = parser.parse_args()
+
+    # Imported here: rag_with_chatbotp itself imports this module
+    from rag_with_chatbotp import RAGSystem
+    rag = RAGSystem(db_path=args.db_path, collection_name=args.collection, rebuild=args.rebuild)
+    rag.ingest_paths(args.sources, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
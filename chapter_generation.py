@@ -1,75 +1,215 @@
+import argparse
 import json
-from pymilvus import MilvusClient
-import ollama
-from tqdm import tqdm
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from collection_scan import iter_rows
+from ingestion import document_id_range
+from registry import get_vector_client
+from transcript_store import format_timestamp
 
-def retrieve_data_from_db(milvus_client, collection_name):
+def retrieve_data_from_db(milvus_client, collection_name, page_size=1000):
     """
-    Retrieve text data from the Milvus database.
+    Retrieve the stored segments (text, timestamp and vector) from the Milvus
+    database in document order: by document, then by the position recorded at
+    ingestion (ids do not follow the document order).
+    Prefer generate_chapters_from_collection for large collections; this loads
+    every row into memory.
     """
     print("Retrieving data from the database...")
     try:
-        results = milvus_client.query(
-            collection_name=collection_name,
-            filter="id >= 0",  # Retrieve all records (changed 'expr' to 'filter')
-            output_fields=["text"],  # Only retrieving the 'text' field
-        )
+        fields = ["text", "timestamp", "end", "vector", "doc_id", "position"]
+        results = sorted(iter_rows(milvus_client, collection_name, fields, page_size),
+                         key=lambda row: (row["doc_id"], row["position"]))
         print(f"Retrieved {len(results)} records from the database.")
-        return [result["text"] for result in results]
+        return results
     except Exception as e:
         print(f"Error retrieving data from the database: {e}")
         return []
 
-def generate_chapters_from_data(text_data, max_chapters=20):
+def gap_similarities(vectors, window=3):
     """
-    Generate up to 'max_chapters' chapters from the text data.
+    Cosine similarity between the mean vectors of the 'window' segments before and
+    after every gap between consecutive segments (TextTiling block comparison).
+    Computed with prefix sums, so it is linear in the number of segments.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+    prefix = np.concatenate([np.zeros((1, vectors.shape[1]), dtype=np.float32), np.cumsum(vectors, axis=0)])
+    gaps = np.arange(1, len(vectors))
+    left = prefix[gaps] - prefix[np.maximum(gaps - window, 0)]
+    right = prefix[np.minimum(gaps + window, len(vectors))] - prefix[gaps]
+    norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1) + 1e-12
+    return np.sum(left * right, axis=1) / norms
+
+def depth_scores(similarities, window=3):
+    """
+    How deep each gap's similarity dips below the highest similarity within
+    'window' gaps on either side. Deep valleys are topic shifts.
+    """
+    padded = np.pad(similarities, window, mode="edge")
+    peaks = sliding_window_view(padded, window + 1)
+    left_peak = peaks[:len(similarities)].max(axis=1)
+    right_peak = peaks[window:window + len(similarities)].max(axis=1)
+    return (left_peak - similarities) + (right_peak - similarities)
+
+def iter_gap_similarities(vectors, window=3):
+    """
+    Streaming version of gap_similarities: consumes vectors one at a time and
+    only keeps the last 2 * 'window' of them.
+    """
+    buffer = deque(maxlen=2 * window)
+    count, gap = 0, 1
+
+    def block_similarity():
+        first = count - len(buffer)  # index of buffer[0]
+        left = sum(buffer[i - first] for i in range(max(gap - window, 0), gap))
+        right = sum(buffer[i - first] for i in range(gap, min(gap + window, count)))
+        return float(np.dot(left, right) / (np.linalg.norm(left) * np.linalg.norm(right) + 1e-12))
+
+    for vector in vectors:
+        vector = np.asarray(vector, dtype=np.float32)
+        buffer.append(vector / (np.linalg.norm(vector) + 1e-12))
+        count += 1
+        if gap + window <= count:
+            yield block_similarity()
+            gap += 1
+    while gap < count:
+        yield block_similarity()
+        gap += 1
+
+def select_boundaries(similarities, max_chapters=20, window=3, min_segments=3):
+    """
+    Return the indices of the segments that start a new chapter (always including 0),
+    given the similarity at every gap between consecutive segments.
+    """
+    similarities = np.asarray(similarities, dtype=np.float32)
+    segment_count = len(similarities) + 1
+    if segment_count <= min_segments:
+        return [0]
+    depths = depth_scores(similarities, window)
+    # TextTiling cutoff: keep valleys that are local maxima of depth and clearly deeper than average
+    cutoff = depths.mean() + depths.std() / 2
+    padded = np.pad(depths, 1, mode="constant", constant_values=-np.inf)
+    is_peak = (depths >= padded[:-2]) & (depths >= padded[2:])
+    candidates = [gap for gap in np.argsort(-depths) if is_peak[gap] and depths[gap] > cutoff]
+    boundaries = [0]
+    for gap in candidates:
+        start = int(gap) + 1  # gap i sits between segments i and i + 1
+        if len(boundaries) >= max_chapters:
+            break
+        if all(abs(start - boundary) >= min_segments for boundary in boundaries) and segment_count - start >= min_segments:
+            boundaries.append(start)
+    return sorted(boundaries)
+
+def detect_topic_boundaries(vectors, max_chapters=20, window=3, min_segments=3):
+    """
+    Return the indices of the segments that start a new chapter (always including 0).
+    """
+    if len(vectors) <= min_segments:
+        return [0]
+    return select_boundaries(gap_similarities(vectors, window), max_chapters, window, min_segments)
+
+def build_chapters(rows, boundaries):
+    """
+    Group a stream of segment rows into chapters starting at 'boundaries'.
+    Yields one chapter at a time.
+    """
+    starts = set(boundaries)
+    current = []
+    for index, row in enumerate(rows):
+        if index in starts and current:
+            yield _make_chapter(current)
+            current = []
+        current.append(row)
+    if current:
+        yield _make_chapter(current)
+
+def _make_chapter(rows):
+    # Chunks stored before they had float "end" seconds fall back to the last one's start
+    end = rows[-1].get("end")
+    chapter = {
+        "timestamp": rows[0]["timestamp"],
+        "end": format_timestamp(end) if isinstance(end, (int, float)) else rows[-1]["timestamp"],
+        "text": " ".join(row["text"] for row in rows),
+    }
+    print(f"Chapter [{chapter['timestamp']}]: {len(rows)} segments")
+    return chapter
+
+def generate_chapters_from_data(rows, max_chapters=20):
+    """
+    Split the segments into up to 'max_chapters' chapters at topic boundaries
+    detected from their embeddings. 'rows' need "text", "timestamp" and "vector", plus "end" seconds where known.
     """
     print(f"Generating up to {max_chapters} chapters from the text data...")
-    chapters = []
-    chapter_size = len(text_data) // max_chapters  # Divide text into roughly equal chapters
-    
-    for i in range(max_chapters):
-        start = i * chapter_size
-        end = start + chapter_size
-        if i == max_chapters - 1:  # Ensure the last chapter includes any remaining data
-            end = len(text_data)
-        chapter = " ".join(text_data[start:end])
-        chapters.append(chapter)
-        print(f"Chapter {i + 1}: {len(chapter)} characters")
-
-    return chapters
+    if not rows:
+        return []
+    boundaries = detect_topic_boundaries([row["vector"] for row in rows], max_chapters)
+    return list(build_chapters(rows, boundaries))
 
-def main():
-    # Load transcription with timestamps
-    output_file = "transcription_with_timestamps.json"
-    try:
-        with open(output_file, "r", encoding="utf-8") as file:
-            transcription = json.load(file)
-    except FileNotFoundError:
-        print(f"Error: File '{output_file}' not found. Please ensure the file exists.")
+def _fetch_rows(milvus_client, collection_name, ids, output_fields, page_size=1000):
+    """
+    Yield the rows of 'ids' in that order, fetched with get() 'page_size' ids at a time.
+    Rows deleted since the ids were read are skipped.
+    """
+    for start in range(0, len(ids), page_size):
+        batch = ids[start:start + page_size]
+        rows = {row["id"]: row for row in milvus_client.get(collection_name=collection_name, ids=batch, output_fields=output_fields)}
+        yield from (rows[row_id] for row_id in batch if row_id in rows)
+
+def generate_chapters_from_collection(milvus_client, collection_name, max_chapters=20, page_size=1000, doc_id=None):
+    """
+    Generate chapters straight from a collection, one chapter at a time. Ids do
+    not follow the document order, so a paginated scan first reads only each
+    segment's document and position to put the ids in reading order. The
+    vectors are then fetched in that order, a page at a time, and streamed
+    through the topic-boundary detection; finally each chapter's texts are
+    fetched when it is built. Memory does not grow with the collection size
+    beyond the ordered ids and one similarity value per segment. With 'doc_id',
+    only that document's stored chunks are used (one lecture of a shared
+    collection).
+    """
+    print(f"Generating up to {max_chapters} chapters from '{collection_name}'...")
+    id_range = document_id_range(doc_id) if doc_id is not None else None
+    rows = iter_rows(milvus_client, collection_name, ["doc_id", "position"], page_size, id_range=id_range)
+    order = [row_id for _, _, row_id in sorted(
+        (row["doc_id"], row["position"], row["id"]) for row in rows if doc_id is None or row["doc_id"] == doc_id
+    )]
+    if not order:
         return
-    
+    vectors = (row["vector"] for row in _fetch_rows(milvus_client, collection_name, order, ["vector"], page_size))
+    similarities = np.fromiter(iter_gap_similarities(vectors), dtype=np.float32)
+    boundaries = select_boundaries(similarities, max_chapters)
+    for start, end in zip(boundaries, boundaries[1:] + [len(order)]):
+        yield _make_chapter(list(_fetch_rows(milvus_client, collection_name, order[start:end], ["text", "timestamp", "end"], page_size)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Split an ingested lecture into chapters.")
+    parser.add_argument("--db-path", default="./milvus_demo.db",
+                        help="Milvus Lite file or server URI, or a .npvec file for the in-process NumPy index")
+    parser.add_argument("--collection", default="my_rag_collection")
+    parser.add_argument("--max-chapters", type=int, default=20)
+    parser.add_argument("--output", default="generated_chapters.json")
+    args = parser.parse_args()
+
     # Initialize Milvus client
-    milvus_client = MilvusClient(uri="./milvus_demo.db")
-    collection_name = "my_rag_collection"
-    
-    # Retrieve text data from the database
-    text_data = retrieve_data_from_db(milvus_client, collection_name)
-    
-    if not text_data:
+    milvus_client = get_vector_client(args.db_path)
+    collection_name = args.collection
+
+    # Stream the segments and their stored embeddings from the database
+    chapters = list(generate_chapters_from_collection(milvus_client, collection_name, max_chapters=args.max_chapters))
+
+    if not chapters:
         print("No data found in the collection. Exiting.")
         return
 
-    # Generate chapters
-    chapters = generate_chapters_from_data(text_data, max_chapters=20)
-
     # Display chapters
     for i, chapter in enumerate(chapters):
-        print(f"\n--- Chapter {i + 1} ---\n")
-        print(chapter[:500])  # Display the first 500 characters of each chapter
+        print(f"\n--- Chapter {i + 1} [{chapter['timestamp']}] ---\n")
+        print(chapter["text"][:500])  # Display the first 500 characters of each chapter
 
     # Optionally save chapters to a file
-    output_file = "generated_chapters.json"
+    output_file = args.output
     with open(output_file, "w", encoding="utf-8") as file:
         json.dump(chapters, file, indent=4, ensure_ascii=False)
     print(f"\nChapters saved successfully to '{output_file}'.")
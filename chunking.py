@@ -0,0 +1,160 @@
+import re
+
+from transcript_store import with_times
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+MAX_SENTENCE_CHARS = 10_000
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (about four characters per token for English text).
+    """
+    return len(text) // 4 + 1
+
+
+def group_segments(segments, token_budget, overlap_tokens=0):
+    """
+    Group consecutive transcript segments into chunks of at most 'token_budget'
+    tokens (a single oversized segment becomes a chunk of its own). With
+    'overlap_tokens', each chunk starts with the trailing segments of the
+    previous one, up to that many tokens.
+
+    Returns:
+        List of {"text", "start", "end", "segments"} dictionaries, where "start"
+        and "end" are the timestamps of the first and last segment of the chunk.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+    for segment in segments:
+        tokens = estimate_tokens(segment["text"])
+        if current and current_tokens + tokens > token_budget:
+            chunks.append(_make_chunk(current))
+            current = _tail(current, overlap_tokens, lambda item: estimate_tokens(item["text"]))
+            current_tokens = sum(estimate_tokens(item["text"]) for item in current)
+        current.append(segment)
+        current_tokens += tokens
+    if current:
+        chunks.append(_make_chunk(current))
+    return chunks
+
+
+def _tail(items, budget, size):
+    """
+    Longest suffix of 'items' whose total size stays within 'budget'.
+    """
+    tail, total = [], 0
+    for item in reversed(items):
+        total += size(item)
+        if total > budget:
+            break
+        tail.insert(0, item)
+    return tail
+
+
+def merge_transcript_segments(segments, target_tokens=120, overlap_tokens=0):
+    """
+    Merge adjacent short Whisper segments into fewer, denser chunks for embedding.
+    Each chunk keeps the display timestamp of its first segment, plus float
+    "start" and "end" seconds (from the display timestamps for transcripts
+    that lack numeric times; see transcript_store.with_times).
+    """
+    return [
+        {
+            "text": chunk["text"],
+            "timestamp": chunk["segments"][0]["timestamp"],
+            "start": chunk["start"],
+            "end": chunk["end"],
+        }
+        for chunk in group_segments(with_times(list(segments)), target_tokens, overlap_tokens)
+    ]
+
+
+def iter_tagged_sentences(tagged_pieces):
+    """
+    Split (tag, text) pieces (e.g. (page number, page text)) into (tag, sentence)
+    pairs. A sentence may continue from one piece into the next; it is tagged
+    with the piece it started in.
+    """
+    carry, carry_tag = "", None
+    for tag, piece in tagged_pieces:
+        parts = SENTENCE_END.split(carry + piece)
+        first_tag = carry_tag if carry.strip() else tag
+        carry = parts.pop()
+        if len(carry) > MAX_SENTENCE_CHARS:
+            # Text without sentence punctuation; don't buffer it forever
+            parts.append(carry)
+            carry = ""
+        for index, part in enumerate(parts):
+            part = " ".join(part.split())
+            if part:
+                yield (first_tag if index == 0 else tag), part
+        carry_tag = first_tag if not parts else tag
+    carry = " ".join(carry.split())
+    if carry:
+        yield carry_tag, carry
+
+
+def _split_long(sentence, target_tokens):
+    words = sentence.split()
+    # Roughly target_tokens worth of words per piece
+    step = max(target_tokens * 3 // 4, 1)
+    for start in range(0, len(words), step):
+        yield " ".join(words[start:start + step])
+
+
+def chunk_tagged_text(tagged_pieces, target_tokens=200, overlap_tokens=40):
+    """
+    Stream sentence-aligned chunks of about 'target_tokens' tokens from (tag, text)
+    pieces. Chunks never cut a word or a sentence (sentences longer than a chunk
+    are split at word boundaries), and each chunk repeats up to 'overlap_tokens'
+    tokens of trailing sentences from the previous chunk.
+
+    Yields:
+        (text, first tag, last tag) for each chunk.
+    """
+    current, current_tokens = [], 0
+    for tag, sentence in iter_tagged_sentences(tagged_pieces):
+        for part in _split_long(sentence, target_tokens) if estimate_tokens(sentence) > target_tokens else [sentence]:
+            tokens = estimate_tokens(part)
+            if current and current_tokens + tokens > target_tokens:
+                yield " ".join(text for _, text in current), current[0][0], current[-1][0]
+                current = _tail(current, overlap_tokens, lambda item: estimate_tokens(item[1]))
+                current_tokens = sum(estimate_tokens(text) for _, text in current)
+            current.append((tag, part))
+            current_tokens += tokens
+    if current:
+        yield " ".join(text for _, text in current), current[0][0], current[-1][0]
+
+
+def chunk_text(pieces, target_tokens=200, overlap_tokens=40):
+    """
+    Stream sentence-aligned chunk texts from a string or an iterable of strings.
+    See chunk_tagged_text.
+    """
+    if isinstance(pieces, str):
+        pieces = [pieces]
+    for text, _, _ in chunk_tagged_text(((None, piece) for piece in pieces), target_tokens, overlap_tokens):
+        yield text
+
+
+def chunk_pages(pages, target_tokens=200, overlap_tokens=40):
+    """
+    Chunk (page number, text) pairs, keeping the page range of every chunk.
+
+    Yields:
+        {"text", "page", "last_page"} dictionaries.
+    """
+    # Page breaks separate words even when the extracted text has no trailing whitespace
+    pages = ((number, text + "\n") for number, text in pages)
+    for text, first_page, last_page in chunk_tagged_text(pages, target_tokens, overlap_tokens):
+        yield {"text": text, "page": first_page, "last_page": last_page}
+
+
+def _make_chunk(segments):
+    return {
+        "text": " ".join(segment["text"] for segment in segments),
+        "start": segments[0].get("start", segments[0].get("timestamp")),
+        "end": segments[-1].get("end", segments[-1].get("timestamp")),
+        "segments": segments,
+    }
@@ -0,0 +1,77 @@
+import re
+
+ID_FILTER = re.compile(r"^\s*\(?\s*id\s*(>=|>)\s*(-?\d+)\s*\)?\s*$")
+
+
+def parse_id_filter(expr):
+    """
+    Parse the filters scan_collection issues ("id > N" / "id >= N", or an empty
+    filter for every row), for clients other than Milvus. Returns a predicate
+    on ids that also works elementwise on NumPy arrays.
+    """
+    if not expr or not expr.strip():
+        # Like Milvus, no filter matches every row
+        return lambda row_id: row_id == row_id
+    match = ID_FILTER.match(expr)
+    if not match:
+        raise NotImplementedError(
+            f"Unsupported filter {expr!r}: only 'id > N' and 'id >= N' work without Milvus."
+        )
+    operator, bound = match.group(1), int(match.group(2))
+    if operator == ">=":
+        return lambda row_id: row_id >= bound
+    return lambda row_id: row_id > bound
+
+
+def scan_collection(client, collection_name, output_fields, page_size=1000, filter="", id_range=None):
+    """
+    Yield the rows of a collection page by page, in ascending id order.
+
+    Pages are fetched with id-range pagination ("id > <last id of the previous
+    page>" with a limit), so no single query hits Milvus' result size limit and
+    only one page is held in memory at a time.
+
+    Parameters:
+        client: MilvusClient to query.
+        collection_name (str): Collection to scan.
+        output_fields (list): Fields to return in addition to "id".
+        page_size (int): Number of rows per page.
+        filter (str): Optional extra filter expression. Needs Milvus; clients
+            with supports_filter_expressions = False (the NumPy index, the
+            benchmark stub) reject it before the scan starts.
+        id_range (tuple): Optional (first, end) ids; only rows with
+            first <= id < end are returned. Works with every client, since it
+            only moves the start of the pagination and stops the scan early.
+    """
+    if filter and not getattr(client, "supports_filter_expressions", True):
+        raise NotImplementedError(
+            f"{type(client).__name__} only supports id-range scans; filter {filter!r} needs a Milvus store."
+        )
+    fields = ["id", *[field for field in output_fields if field != "id"]]
+    first_id, end_id = id_range or (0, None)
+    last_id = None
+    while True:
+        expr = f"id >= {first_id}" if last_id is None else f"id > {last_id}"
+        if filter:
+            expr = f"({expr}) and ({filter})"
+        page = client.query(collection_name=collection_name, filter=expr, output_fields=fields, limit=page_size)
+        if not page:
+            return
+        page.sort(key=lambda row: row["id"])
+        full = len(page) == page_size
+        if end_id is not None and page[-1]["id"] >= end_id:
+            page = [row for row in page if row["id"] < end_id]
+            full = False
+        if page:
+            yield page
+        if not full:
+            return
+        last_id = page[-1]["id"]
+
+
+def iter_rows(client, collection_name, output_fields, page_size=1000, filter="", id_range=None):
+    """
+    Same as scan_collection, flattened to one row at a time.
+    """
+    for page in scan_collection(client, collection_name, output_fields, page_size, filter, id_range):
+        yield from page
@@ -0,0 +1,141 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chunking import estimate_tokens
+from llm import collect, stream_generate
+from registry import get_resource
+from telemetry import span
+
+
+def summarize_conversation(summary, turns_text, model="llama3.2"):
+    """
+    Fold older conversation turns into the rolling summary with one LLM call.
+    """
+    prompt = ("""
+    You maintain a short running summary of a conversation between a Human and an AI.
+    Update the summary with the new turns below. Keep names, facts and open questions; stay under 150 words.
+    Current summary:""" + (summary or "(empty)") + """
+    New turns:
+    """ + turns_text)
+    return collect(stream_generate({"model": model, "prompt": prompt})).strip()
+
+
+def _format_turns(turns):
+    return "\n".join(f"Human: {query}\nAI: {answer}" for query, answer in turns)
+
+
+class SummarizingMemory:
+    """
+    Token-budgeted conversation memory.
+
+    The most recent turns are kept verbatim as long as they fit in 'token_budget'
+    (and there are at most 'max_recent_turns' of them). Older turns are folded
+    into a rolling summary by 'summarize' on a background thread; until the fold
+    is done the newest of them are rendered verbatim as far as the budget left
+    by the recent turns allows. A failed summary is retried 'fold_attempts'
+    times with exponential backoff; if it still fails, the turns waiting to be
+    folded are trimmed to 'token_budget' so they cannot pile up. The rendered
+    history is cached and only rebuilt after the memory changes.
+    """
+
+    def __init__(self, token_budget=800, max_recent_turns=6, summarize=summarize_conversation, executor=None,
+                 fold_attempts=3, retry_delay=1.0):
+        self.token_budget = token_budget
+        self.max_recent_turns = max_recent_turns
+        self.summarize = summarize
+        self.fold_attempts = fold_attempts
+        self.retry_delay = retry_delay
+        self.executor = executor or get_resource(("memory_executor",), lambda: ThreadPoolExecutor(max_workers=2))
+        self.summary = ""
+        self.folding = []
+        self.recent = []
+        self._rendered = None
+        self._pending = None
+        # Bumped by clear(), so a fold started before it is discarded
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def add_turn(self, query, answer):
+        with self._lock:
+            self.recent.append((query, answer))
+            self._rendered = None
+            overflow = []
+            while len(self.recent) > 1 and (
+                len(self.recent) > self.max_recent_turns
+                or estimate_tokens(_format_turns(self.recent)) > self.token_budget
+            ):
+                overflow.append(self.recent.pop(0))
+            if overflow:
+                self.folding.extend(overflow)
+                self._schedule_fold()
+
+    def _schedule_fold(self):
+        # One fold at a time; turns that overflow meanwhile are picked up by the next one
+        if self._pending is None or self._pending.done():
+            self._pending = self.executor.submit(self._fold, self.summary, list(self.folding), self._generation)
+
+    def _fold(self, summary, turns, generation):
+        for attempt in range(self.fold_attempts):
+            try:
+                new_summary = self.summarize(summary, _format_turns(turns))
+                break
+            except Exception as e:
+                print(f"Could not summarize the conversation (attempt {attempt + 1}): {e}")
+                if attempt + 1 < self.fold_attempts:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        else:
+            with self._lock:
+                if generation == self._generation:
+                    self._trim_folding()
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self.summary = new_summary
+            # Compared by identity: the list may have been trimmed since the fold started
+            folded = {id(turn) for turn in turns}
+            self.folding = [turn for turn in self.folding if id(turn) not in folded]
+            self._rendered = None
+            if self.folding:
+                self._pending = self.executor.submit(self._fold, self.summary, list(self.folding), generation)
+
+    def _trim_folding(self):
+        # Keep only the newest unfolded turns that fit in the budget; the next fold retries with them
+        while len(self.folding) > 1 and estimate_tokens(_format_turns(self.folding)) > self.token_budget:
+            self.folding.pop(0)
+        self._rendered = None
+
+    def render(self):
+        """
+        History text for the prompt: rolling summary, then not-yet-folded and recent turns.
+        """
+        with span("memory.render"), self._lock:
+            if self._rendered is None:
+                parts = []
+                if self.summary:
+                    parts.append(f"Summary of the earlier conversation: {self.summary}")
+                # Unfolded turns only fill what the recent ones leave of the budget
+                room = self.token_budget - estimate_tokens(_format_turns(self.recent))
+                waiting = []
+                for turn in reversed(self.folding):
+                    room -= estimate_tokens(_format_turns([turn]))
+                    if room < 0:
+                        break
+                    waiting.insert(0, turn)
+                if waiting:
+                    parts.append(_format_turns(waiting))
+                if self.recent:
+                    parts.append(_format_turns(self.recent))
+                self._rendered = "\n".join(parts)
+            return self._rendered
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            # A fold still running belongs to the old conversation; do not wait for it
+            self._pending = None
+            self.summary = ""
+            self.folding = []
+            self.recent = []
+            self._rendered = None
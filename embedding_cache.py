@@ -0,0 +1,119 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+DEFAULT_CACHE_PATH = os.environ.get("ZETA_EMBEDDING_CACHE", "./embedding_cache.db")
+
+
+def normalize_text(text):
+    """
+    Normalize text before hashing so whitespace-only changes still hit the cache.
+    """
+    return " ".join(text.split())
+
+
+def text_key(text):
+    """
+    Content hash of the normalized text, used as the cache key.
+    """
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding cache backed by SQLite.
+
+    Vectors are stored as float32 blobs keyed by (model name, hash of the
+    normalized text). The number of stored vectors is bounded by 'max_entries';
+    the least recently used ones are evicted first. The embedding dimension of
+    each model is remembered as well, so it never has to be probed twice.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=200_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS dimensions (model TEXT PRIMARY KEY, dimension INTEGER NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, model, texts):
+        """
+        Look up 'texts' and return a dict mapping each cached text to its vector.
+        """
+        keys = {text_key(text): text for text in texts}
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            key_list = list(keys)
+            # Stay below SQLite's bound parameter limit
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[keys[key]] = vector.tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                    [(now, model, text_key(text)) for text in found],
+                )
+                self._conn.commit()
+        return found
+
+    def get(self, model, text):
+        return self.get_many(model, [text]).get(text)
+
+    def put_many(self, model, items):
+        """
+        Store (text, vector) pairs and evict the least recently used entries if
+        the cache grew past 'max_entries'.
+        """
+        now = time.time()
+        rows = [(model, text_key(text), array("f", vector).tobytes(), now) for text, vector in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN"
+                    " (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def put(self, model, text, vector):
+        self.put_many(model, [(text, vector)])
+
+    def get_dimension(self, model):
+        with self._lock:
+            row = self._conn.execute("SELECT dimension FROM dimensions WHERE model = ?", (model,)).fetchone()
+        return row[0] if row else None
+
+    def set_dimension(self, model, dimension):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO dimensions VALUES (?, ?)", (model, dimension))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,145 @@
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+
+from registry import get_ollama_client
+from telemetry import span
+
+EMBEDDING_MODEL = "mxbai-embed-large"
+
+
+def is_transient_error(error):
+    """
+    Return True for Ollama failures that are worth retrying (connection drops,
+    timeouts, overload and 5xx responses).
+    """
+    # Only needed once something failed, so kept out of the import path
+    import httpx
+    import ollama
+    if isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def batched(iterable, batch_size):
+    """
+    Split any iterable (including generators) into lists of at most 'batch_size' items.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class EmbeddingEngine:
+    """
+    Batched, concurrent embedding client for Ollama.
+
+    Texts are grouped into batches that are sent to the multi-input embed
+    endpoint by a bounded pool of worker threads. At most 'max_pending' batches
+    are in flight at once, so a slow server applies backpressure to the caller
+    instead of the whole input being queued in memory.
+
+    When an EmbeddingCache is given, only texts missing from the cache are sent
+    to Ollama and new vectors are written back to it.
+    """
+
+    def __init__(self, model=EMBEDDING_MODEL, batch_size=32, max_workers=4,
+                 max_pending=None, max_retries=3, retry_backoff=0.5, cache=None):
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 2
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        attempt = 0
+        while True:
+            try:
+                with span("ollama.embed", model=self.model, batch_size=len(texts), attempt=attempt):
+                    response = get_ollama_client().embed(model=self.model, input=texts)
+                return response["embeddings"]
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                print(f"Embedding batch failed ({e}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                attempt += 1
+
+    def iter_batches(self, texts):
+        """
+        Embed 'texts' and yield (offset, texts, vectors) per batch, in input order,
+        as soon as each batch is done. 'offset' is the index of the first text of
+        the batch in the input.
+        """
+        pending = deque()
+        offset = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for batch in batched(texts, self.batch_size):
+                if len(pending) >= self.max_pending:
+                    yield self._collect(pending.popleft())
+                pending.append((offset, batch, *self._submit(executor, batch)))
+                offset += len(batch)
+            while pending:
+                yield self._collect(pending.popleft())
+
+    def _submit(self, executor, batch):
+        cached = self.cache.get_many(self.model, batch) if self.cache else {}
+        misses = list(dict.fromkeys(text for text in batch if text not in cached))
+        if misses:
+            return cached, misses, executor.submit(self._embed_batch, misses)
+        future = Future()
+        future.set_result([])
+        return cached, misses, future
+
+    def _collect(self, entry):
+        offset, batch, cached, misses, future = entry
+        vectors = future.result()
+        if misses:
+            if self.cache:
+                self.cache.put_many(self.model, zip(misses, vectors))
+            cached.update(zip(misses, vectors))
+        return offset, batch, [cached[text] for text in batch]
+
+    def embed(self, texts) -> list[list[float]]:
+        """
+        Embed all 'texts' and return the vectors in input order.
+        """
+        vectors = []
+        for _, _, batch_vectors in self.iter_batches(texts):
+            vectors.extend(batch_vectors)
+        return vectors
+
+    def embed_one(self, text: str) -> list[float]:
+        """
+        Embed a single text (e.g. a query) without going through the pool.
+        """
+        with span("embedding.query", model=self.model) as current:
+            if self.cache:
+                vector = self.cache.get(self.model, text)
+                if vector is not None:
+                    current.set(cached=True)
+                    return vector
+            vector = self._embed_batch([text])[0]
+            if self.cache:
+                self.cache.put(self.model, text, vector)
+            return vector
+
+    def dimension(self) -> int:
+        """
+        Embedding dimension of the model, probed once and then remembered in the cache.
+        """
+        dimension = self.cache.get_dimension(self.model) if self.cache else None
+        if dimension is None:
+            dimension = len(self._embed_batch(["This is a test"])[0])
+            if self.cache:
+                self.cache.set_dimension(self.model, dimension)
+        return dimension
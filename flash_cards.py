@@ -1,19 +1,27 @@
-import requests
+import argparse
 import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from chunking import group_segments
+from embeddings import EmbeddingEngine
+from llm import collect, stream_generate
+from registry import get_embedding_cache
+from telemetry import traced
+from transcript_store import default_transcript_path, load_segments, read_transcription_segments
 
-def make_api_call(payload):
-    url = "http://localhost:11434/api/generate"
-    headers = {
-        "Content-Type": "application/json"
-    }
+# Compact card record; start/end are the timestamps of the window the card came from
+Flashcard = namedtuple("Flashcard", ["question", "answer", "start", "end"])
+
+@traced("flashcards.make_api_call")
+def make_api_call(payload, on_token=None):
+    """
+    Stream a generation from Ollama and return the full text. 'on_token' is
+    called with every token as it arrives (e.g. to print it right away).
+    """
+    import requests
     try:
-        with requests.post(url, headers=headers, data=json.dumps(payload), stream=True) as response:
-            full_text = ""
-            for line in response.iter_lines(decode_unicode=True):
-                if line:
-                    response_data = json.loads(line)
-                    full_text += response_data["response"]
-            return full_text
+        return collect(stream_generate(payload), on_token)
     except requests.RequestException as e:
         print("Error:", e)
         return None
@@ -41,15 +49,105 @@ def generate_flashcards(text):
     response_data = make_api_call(payload)
     return response_data
 
-def handle_flashcards_output(response_text):
+def generate_window_flashcards(window, cards_per_window=5):
+    """
+    Ask for 'cards_per_window' flashcards about one transcript window as JSON.
+    """
+    prompt = ("""
+    You are a Flashcard Generating AI. Based on the content provided, create """ + str(cards_per_window) + """ flashcards.
+    Focus on extracting key points, facts, or concepts from the content. Keep questions and answers concise.
+    Respond only with JSON in the format:
+    {"flashcards": [{"question": "<question>", "answer": "<answer>"}]}
+    Content:""" + window["text"])
+    payload = {
+        "model": "llama3.2",
+        "prompt": prompt,
+        "format": "json",
+    }
+    return parse_flashcards(make_api_call(payload), window["start"], window["end"])
+
+def parse_flashcards(response_text, start=None, end=None):
+    """
+    Parse the model's JSON output into Flashcard records, skipping malformed entries.
+    """
+    try:
+        data = json.loads(response_text or "")
+    except json.JSONDecodeError:
+        print("Could not parse flashcards from the model response.")
+        return []
+    items = data.get("flashcards", []) if isinstance(data, dict) else data
+    cards = []
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and item.get("question") and item.get("answer"):
+            cards.append(Flashcard(str(item["question"]).strip(), str(item["answer"]).strip(), start, end))
+    return cards
+
+class FlashcardDeduplicator:
+    """
+    Incrementally drops cards whose question is a near-duplicate (cosine similarity
+    of the question embeddings at or above 'threshold') of a card already kept.
+    """
+
+    def __init__(self, embedder, threshold=0.9):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.kept_vectors = []
+
+    def filter(self, cards):
+        if not cards:
+            return []
+        vectors = np.asarray(self.embedder.embed(card.question for card in cards), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        unique = []
+        for card, vector in zip(cards, vectors):
+            if not self.kept_vectors or np.max(np.asarray(self.kept_vectors) @ vector) < self.threshold:
+                self.kept_vectors.append(vector)
+                unique.append(card)
+        return unique
+
+def iter_flashcards_from_segments(segments, window_tokens=1500, cards_per_window=5, max_workers=4, ordered=False):
+    """
+    Generate flashcards for each transcript window concurrently and yield the
+    unique ones as soon as their window is done. Unless 'ordered' is set, windows
+    come out in completion order rather than transcript order.
+    """
+    windows = group_segments(segments, window_tokens)
+    print(f"Generating flashcards for {len(windows)} windows with {max_workers} workers...")
+    deduplicator = FlashcardDeduplicator(EmbeddingEngine(cache=get_embedding_cache()))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(generate_window_flashcards, window, cards_per_window) for window in windows]
+        for future in futures if ordered else as_completed(futures):
+            yield from deduplicator.filter(future.result())
+
+def generate_flashcards_from_segments(segments, window_tokens=1500, cards_per_window=5, max_workers=4):
+    """
+    Generate flashcards for each transcript window concurrently, without
+    near-duplicate questions across windows, ordered by window.
+    """
+    cards = list(iter_flashcards_from_segments(segments, window_tokens, cards_per_window, max_workers, ordered=True))
+    print(f"Kept {len(cards)} unique flashcards.")
+    return cards
+
+def print_flashcard(number, card):
+    print(f"Flashcard {number} [{card.start}]:")
+    print(f"Question: {card.question}")
+    print(f"Answer: {card.answer}\n")
+
+def handle_flashcards_output(cards, output_file="flashcards.json"):
     print("Generated Flashcards:")
-    print(response_text)
+    for i, card in enumerate(cards, start=1):
+        print_flashcard(i, card)
+    save_flashcards(cards, output_file)
+
+def save_flashcards(cards, output_file="flashcards.json"):
+    with open(output_file, "w", encoding="utf-8") as file:
+        json.dump([card._asdict() for card in cards], file, ensure_ascii=False)
+    print(f"Flashcards saved to {output_file}")
 
 # Read the transcription file and extract text
 def read_transcription_from_file(transcription_file):
     try:
-        with open(transcription_file, "r", encoding="utf-8") as file:
-            transcription_data = json.load(file)
+        transcription_data = load_segments(transcription_file)
         # Extract text from the transcription (combine all segments)
         full_text = " ".join([segment["text"] for segment in transcription_data])
         return full_text
@@ -65,17 +163,25 @@ def read_transcription_from_file(transcription_file):
 
 # Main function to combine transcription and flashcard generation
 def main():
-    # Input file for transcription
-    transcription_file = "transcription_with_timestamps.json"
+    parser = argparse.ArgumentParser(description="Generate flashcards from a transcription with Ollama.")
+    parser.add_argument("transcription_file", nargs="?", default=None,
+                        help="Transcript store, JSON or JSON Lines file (default: the one transcript.py wrote)")
+    args = parser.parse_args()
+
+    # Input file for transcription (the columnar store when there is one)
+    transcription_file = args.transcription_file or default_transcript_path()
 
     # Read the transcription
-    transcription_text = read_transcription_from_file(transcription_file)
+    segments = read_transcription_segments(transcription_file)
 
-    if transcription_text:
+    if segments:
         print("Generating flashcards...")
-        # Generate the flashcards
-        flashcards_result = generate_flashcards(transcription_text)
-        handle_flashcards_output(flashcards_result)
+        # Print each card as soon as its window is done
+        flashcards = []
+        for card in iter_flashcards_from_segments(segments):
+            flashcards.append(card)
+            print_flashcard(len(flashcards), card)
+        save_flashcards(flashcards)
     else:
         print("No transcription text to generate flashcards.")
 
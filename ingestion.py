@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+from collections import Counter
+
+from registry import get_semantic_cache
+from telemetry import span
+
+# Primary keys are 63-bit integers laid out as | document (24) | content (39) |, where the
+# content part hashes the chunk's content hash and its occurrence index (how many identical
+# chunks come before it in the document). They are stable across runs and unique per
+# document, and inserting or removing a chunk leaves the ids of the others alone. The
+# chunk's place in the document is the stored "position" field, which is updated in place
+# when earlier chunks change; ids do not sort in document order.
+DOC_BITS, CONTENT_BITS = 24, 39
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def content_hash(row):
+    """
+    Hash of everything stored for a chunk (text plus metadata such as timestamps)
+    except its position.
+    """
+    return _digest(json.dumps(row, sort_keys=True, ensure_ascii=False))
+
+
+def _doc_part(doc_id):
+    return int(_digest(doc_id), 16) & ((1 << DOC_BITS) - 1)
+
+
+def chunk_id(doc_id, row_hash, occurrence=0):
+    """
+    Stable, content-derived primary key for the 'occurrence'-th chunk of 'doc_id'
+    with content hash 'row_hash'.
+    """
+    content_part = int(_digest(f"{row_hash}:{occurrence}"), 16) & ((1 << CONTENT_BITS) - 1)
+    return (_doc_part(doc_id) << CONTENT_BITS) | content_part
+
+
+def document_id_range(doc_id):
+    """
+    (first, end) ids of the chunks of 'doc_id', for collection_scan's id_range.
+    The 24-bit document part can collide, so callers still check "doc_id".
+    """
+    doc_part = _doc_part(doc_id)
+    return doc_part << CONTENT_BITS, (doc_part + 1) << CONTENT_BITS
+
+
+def manifest_path_for(db_path):
+    return f"{db_path}.manifest.json"
+
+
+class IngestionManifest:
+    """
+    Per-document record of the chunks stored in each collection.
+
+    Layout: {collection: {doc_id: {chunk id: [content hash, position]}}}, saved
+    as JSON next to the Milvus database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.collections = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.collections = json.load(file)
+
+    def chunks(self, collection_name, doc_id):
+        return self.collections.get(collection_name, {}).get(doc_id, {})
+
+    def set_chunks(self, collection_name, doc_id, chunks):
+        self.collections.setdefault(collection_name, {})[doc_id] = chunks
+
+    def documents(self, collection_name):
+        return list(self.collections.get(collection_name, {}))
+
+    def has_document(self, collection_name, doc_id):
+        return doc_id in self.collections.get(collection_name, {})
+
+    def forget_collection(self, collection_name):
+        self.collections.pop(collection_name, None)
+
+    def version(self):
+        """
+        Modification time of the saved manifest (None before the first save).
+        Every ingestion saves it, in this process or another.
+        """
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.collections, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def answer_cache_scope(manifest, collection_name):
+    """
+    Semantic-cache scope of a collection. The manifest file stands for the
+    database (there is one per db_path), so equally named collections in
+    different stores never share answers.
+    """
+    return (manifest.path, collection_name)
+
+
+def save_ingestion_progress(client, collection_name, manifest):
+    """
+    Flush the vector store, then save the manifest, so the manifest never
+    records chunks the store could still lose. Flushing rewrites a NumPy index
+    file and seals a Milvus segment, so it is done once per run or every many
+    documents, not per document.
+    """
+    client.flush(collection_name=collection_name)
+    manifest.save()
+
+
+def ensure_collection(client, collection_name, dimension, manifest, rebuild=False, lexical_index=None,
+                      checkpoint_path=None):
+    """
+    Create the collection if needed. Existing collections are kept unless
+    'rebuild' is set (e.g. after switching embedding models). A newly created
+    collection also drops its entries from the bulk ingestion checkpoint at
+    'checkpoint_path', so the next bulk run ingests every file again.
+    """
+    if client.has_collection(collection_name):
+        if not rebuild:
+            print(f"Collection '{collection_name}' exists. Ingesting incrementally.")
+            return
+        print(f"Collection '{collection_name}' exists. Dropping it for a rebuild.")
+        client.drop_collection(collection_name)
+    client.create_collection(
+        collection_name=collection_name,
+        dimension=dimension,
+        metric_type="IP",
+        consistency_level="Strong",
+    )
+    # The stored chunks are gone, so whatever the manifest says about them is stale
+    manifest.forget_collection(collection_name)
+    manifest.save()
+    if lexical_index is not None:
+        lexical_index.clear(collection_name)
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        # Imported here: bulk_ingest itself imports this module
+        from bulk_ingest import IngestionCheckpoint
+        checkpoint = IngestionCheckpoint(checkpoint_path)
+        checkpoint.forget_collection(collection_name)
+        checkpoint.save()
+    get_semantic_cache().invalidate(answer_cache_scope(manifest, collection_name))
+    print(f"Collection '{collection_name}' created.")
+
+
+def ingest_document(client, collection_name, embedder, manifest, doc_id, rows, lexical_index=None, save=True):
+    """
+    Incrementally ingest one document.
+
+    'rows' are dicts with at least a "text" key plus any metadata to store; it
+    may be a generator, in which case embedding starts while rows are still
+    being produced. Only chunks that are new or changed since the last
+    ingestion of 'doc_id' are embedded and upserted; chunks that only moved
+    (e.g. after an insertion earlier in the document) get their new position
+    with their stored vector, and chunks that no longer exist are deleted.
+    With a 'lexical_index', the BM25 index is kept in step
+    (chunks it is missing, e.g. from before it existed, are backfilled).
+    With 'save' unset the manifest is only updated in memory and the vector
+    store is not flushed; bulk callers do both every so many documents (see
+    save_ingestion_progress).
+
+    Returns:
+        Dict with the number of added, moved, unchanged and deleted chunks.
+    """
+    previous = manifest.chunks(collection_name, doc_id)
+    current = {}
+    changed = []
+    moved = []
+    indexed = lexical_index.document_ids(collection_name, doc_id) if lexical_index is not None else set()
+    unindexed = []
+    occurrences = Counter()
+
+    def changed_texts():
+        for position, row in enumerate(rows):
+            row = {**row, "doc_id": doc_id}
+            row_hash = content_hash(row)
+            occurrence = occurrences[row_hash]
+            occurrences[row_hash] += 1
+            row_id = str(chunk_id(doc_id, row_hash, occurrence))
+            while row_id in current:
+                # Another chunk of this document hashed to the same id; take the next free one
+                occurrence += 1
+                row_id = str(chunk_id(doc_id, row_hash, occurrence))
+            current[row_id] = [row_hash, position]
+            row = {"id": int(row_id), **row, "position": position}
+            stored = previous.get(row_id)
+            if not isinstance(stored, list) or stored[0] != row_hash:
+                changed.append(row)
+                yield row["text"]
+            elif stored[1] != position:
+                moved.append(row)
+            elif lexical_index is not None and row["id"] not in indexed:
+                unindexed.append(row)
+
+    from tqdm import tqdm
+    with tqdm(desc=f"Embedding {doc_id}", unit="chunk") as progress:
+        for offset, batch, vectors in embedder.iter_batches(changed_texts()):
+            # Rows of a batch were appended to 'changed' before the batch was formed
+            data = [
+                {**row, "vector": vector}
+                for row, vector in zip(changed[offset:offset + len(batch)], vectors)
+            ]
+            with span("milvus.upsert", collection=collection_name, batch_size=len(data)):
+                client.upsert(collection_name=collection_name, data=data)
+            progress.update(len(batch))
+
+    if moved:
+        _move_chunks(client, collection_name, embedder, moved)
+
+    stale = [int(row_id) for row_id in previous if row_id not in current]
+    if stale:
+        with span("milvus.delete", collection=collection_name, batch_size=len(stale)):
+            client.delete(collection_name=collection_name, ids=stale)
+
+    if lexical_index is not None:
+        lexical_index.remove(collection_name, [row_id for row_id in indexed if str(row_id) not in current])
+        lexical_index.add(collection_name, doc_id, changed + moved + unindexed)
+
+    manifest.set_chunks(collection_name, doc_id, current)
+    if save and (changed or moved or stale):
+        save_ingestion_progress(client, collection_name, manifest)
+    elif save:
+        manifest.save()
+    if changed or stale:
+        # Cached answers may be based on chunks that just changed
+        get_semantic_cache().invalidate(answer_cache_scope(manifest, collection_name))
+    stats = {"added": len(changed), "moved": len(moved), "unchanged": len(current) - len(changed) - len(moved),
+             "deleted": len(stale)}
+    print(f"Ingested '{doc_id}': {stats['added']} new or changed, {stats['moved']} moved, "
+          f"{stats['unchanged']} unchanged, {stats['deleted']} deleted.")
+    return stats
+
+
+def _move_chunks(client, collection_name, embedder, rows, batch_size=500):
+    # Rewrite moved chunks with their new position, reusing the stored vectors
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        stored = {row["id"]: row["vector"] for row in client.get(
+            collection_name=collection_name, ids=[row["id"] for row in batch], output_fields=["vector"])}
+        # Only if the store lost a chunk the manifest still lists is it embedded again
+        missing = [row for row in batch if row["id"] not in stored]
+        if missing:
+            stored.update(zip((row["id"] for row in missing), embedder.embed(row["text"] for row in missing)))
+        data = [{**row, "vector": stored[row["id"]]} for row in batch]
+        with span("milvus.upsert", collection=collection_name, batch_size=len(data)):
+            client.upsert(collection_name=collection_name, data=data)
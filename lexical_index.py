@@ -0,0 +1,160 @@
+import heapq
+import json
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Lowercased word tokens; keeps names, numbers and codes such as "cs101" intact.
+    """
+    return TOKEN.findall(text.lower())
+
+
+def lexical_index_path_for(db_path):
+    return f"{db_path}.bm25.db"
+
+
+class BM25Index:
+    """
+    Local inverted index over the chunks of each collection, scored with BM25.
+
+    It lives in a SQLite file next to the Milvus database and is kept in step
+    with the collection by ingest_document. Besides the postings it stores the
+    text and metadata of every chunk, so lexical hits can be used without a
+    round trip to Milvus.
+    """
+
+    def __init__(self, path, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " collection TEXT NOT NULL, id INTEGER NOT NULL, doc_id TEXT NOT NULL, length INTEGER NOT NULL,"
+            " text TEXT NOT NULL, fields TEXT NOT NULL, PRIMARY KEY (collection, id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_doc ON chunks (collection, doc_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " collection TEXT NOT NULL, term TEXT NOT NULL, id INTEGER NOT NULL, tf INTEGER NOT NULL,"
+            " length INTEGER NOT NULL, PRIMARY KEY (collection, term, id)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def add(self, collection, doc_id, rows):
+        """
+        Index (or re-index) rows of 'doc_id'. Each row needs "id" and "text";
+        its other fields (except the vector) are stored as metadata.
+        """
+        if not rows:
+            return
+        with self._lock:
+            self._delete(collection, [row["id"] for row in rows])
+            chunks, postings = [], []
+            for row in rows:
+                terms = Counter(tokenize(row["text"]))
+                length = sum(terms.values())
+                fields = {key: value for key, value in row.items() if key not in ("id", "text", "vector")}
+                chunks.append((collection, row["id"], doc_id, length, row["text"], json.dumps(fields, ensure_ascii=False)))
+                postings.extend((collection, term, row["id"], tf, length) for term, tf in terms.items())
+            self._conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?)", chunks)
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?, ?)", postings)
+            self._conn.commit()
+            self._stats.pop(collection, None)
+
+    def remove(self, collection, ids):
+        if not ids:
+            return
+        with self._lock:
+            self._delete(collection, ids)
+            self._conn.commit()
+            self._stats.pop(collection, None)
+
+    def _delete(self, collection, ids):
+        ids = list(ids)
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            terms = self._conn.execute(
+                f"SELECT id, text FROM chunks WHERE collection = ? AND id IN ({placeholders})", [collection, *chunk]
+            ).fetchall()
+            self._conn.executemany(
+                "DELETE FROM postings WHERE collection = ? AND term = ? AND id = ?",
+                [(collection, term, chunk_id) for chunk_id, text in terms for term in set(tokenize(text))],
+            )
+            self._conn.execute(f"DELETE FROM chunks WHERE collection = ? AND id IN ({placeholders})", [collection, *chunk])
+
+    def clear(self, collection):
+        with self._lock:
+            self._conn.execute("DELETE FROM postings WHERE collection = ?", (collection,))
+            self._conn.execute("DELETE FROM chunks WHERE collection = ?", (collection,))
+            self._conn.commit()
+            self._stats.pop(collection, None)
+
+    def document_ids(self, collection, doc_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM chunks WHERE collection = ? AND doc_id = ?", (collection, doc_id)
+            ).fetchall()
+        return {chunk_id for (chunk_id,) in rows}
+
+    def _collection_stats(self, collection):
+        # Chunk count and average length, cached until the collection changes
+        if collection not in self._stats:
+            count, average = self._conn.execute(
+                "SELECT COUNT(*), AVG(length) FROM chunks WHERE collection = ?", (collection,)
+            ).fetchone()
+            self._stats[collection] = (count, average or 1.0)
+        return self._stats[collection]
+
+    def search(self, collection, query, top_k=10):
+        """
+        Return up to 'top_k' (chunk id, BM25 score) pairs, best first.
+        """
+        scores = defaultdict(float)
+        with self._lock:
+            count, average = self._collection_stats(collection)
+            for term, query_tf in Counter(tokenize(query)).items():
+                postings = self._conn.execute(
+                    "SELECT id, tf, length FROM postings WHERE collection = ? AND term = ?", (collection, term)
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf, length in postings:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / average)
+                    scores[chunk_id] += query_tf * idf * tf * (self.k1 + 1) / norm
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def get_chunks(self, collection, ids):
+        """
+        Return {chunk id: {"id", "text", **metadata}} for the indexed 'ids'.
+        """
+        ids = list(ids)
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT id, text, fields FROM chunks WHERE collection = ? AND id IN ({placeholders})",
+                    [collection, *chunk],
+                ).fetchall()
+                for chunk_id, text, fields in rows:
+                    found[chunk_id] = {"id": chunk_id, "text": text, **json.loads(fields)}
+        return found
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,62 @@
+import json
+import os
+
+from registry import get_http_session, get_ollama_client
+from telemetry import trace_tokens
+
+
+def ollama_url():
+    """
+    Base URL of the Ollama server, honouring OLLAMA_HOST like the ollama client does.
+    """
+    host = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+    return host if host.startswith(("http://", "https://")) else f"http://{host}"
+
+
+def stream_generate(payload):
+    """
+    Call Ollama's /api/generate with streaming on and yield response tokens as they arrive.
+    """
+    return trace_tokens("ollama.generate", _generate_tokens(payload), model=payload.get("model"))
+
+
+def _generate_tokens(payload):
+    url = f"{ollama_url()}/api/generate"
+    headers = {"Content-Type": "application/json"}
+    with get_http_session().post(url, headers=headers, data=json.dumps({**payload, "stream": True}), stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                token = json.loads(line).get("response", "")
+                if token:
+                    yield token
+
+
+def stream_chat(messages, model="llama3.2"):
+    """
+    Call ollama.chat with streaming on and yield message tokens as they arrive.
+    """
+    return trace_tokens("ollama.chat", _chat_tokens(messages, model), model=model)
+
+
+def _chat_tokens(messages, model):
+    for chunk in get_ollama_client().chat(model=model, messages=messages, stream=True):
+        token = chunk["message"]["content"]
+        if token:
+            yield token
+
+
+def collect(tokens, on_token=None):
+    """
+    Join a token stream into the full text, calling 'on_token' for each token first.
+    """
+    parts = []
+    for token in tokens:
+        if on_token:
+            on_token(token)
+        parts.append(token)
+    return "".join(parts)
+
+
+def print_token(token):
+    print(token, end="", flush=True)
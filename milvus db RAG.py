@@ -1,74 +1,58 @@
-import json
-from pymilvus import MilvusClient
-import ollama
-from tqdm import tqdm
+import sys
+from chunking import merge_transcript_segments
+from embeddings import EmbeddingEngine
+from ingestion import IngestionManifest, ensure_collection, ingest_document, manifest_path_for
+from lexical_index import lexical_index_path_for
+from llm import collect, print_token, stream_chat
+from registry import get_embedding_cache, get_lexical_index, get_vector_client
+from retrieval import HybridRetriever, build_context
+from transcript_store import default_transcript_path, load_segments
+
+embedding_engine = EmbeddingEngine(cache=get_embedding_cache())
 
 def emb_text(text):
     """
     Generate embedding for the given text using the Ollama embeddings model.
     """
-    response = ollama.embeddings(model="mxbai-embed-large", prompt=text)
-    return response["embedding"]
+    return embedding_engine.embed_one(text)
 
-def main():
-    # Load transcription with timestamps
-    output_file = "transcription_with_timestamps.json"
-    
-    with open(output_file, "r", encoding="utf-8") as file:
-        transcription = json.load(file)
+def ingest_transcription(transcription_file, db_path="./milvus_demo.db", collection_name="my_rag_collection", rebuild=False):
+    """
+    Incrementally ingest a transcription file into the collection.
+
+    Returns:
+        The Milvus client and the BM25 index of the collection.
+    """
+    transcription = load_segments(transcription_file)
     
-    # Get embedding dimension using a sample text
-    embedding_dim = len(emb_text("This is a test"))
+    # Get embedding dimension (probed once per model, then served from the cache)
+    embedding_dim = embedding_engine.dimension()
     print(f"Embedding dimension: {embedding_dim}")
     
     # Initialize Milvus client
-    milvus_client = MilvusClient(uri="./milvus_demo.db")
-    collection_name = "my_rag_collection"
-    
-    # Drop collection if it already exists
-    if milvus_client.has_collection(collection_name):
-        milvus_client.drop_collection(collection_name)
-    
-    # Create new collection
-    milvus_client.create_collection(
-        collection_name=collection_name,
-        dimension=embedding_dim,
-        metric_type="IP",
-        consistency_level="Strong",
-    )
-    print("Collection created successfully.")
+    milvus_client = get_vector_client(db_path)
+    manifest = IngestionManifest(manifest_path_for(db_path))
+    lexical_index = get_lexical_index(lexical_index_path_for(db_path))
     
-    # Prepare data for insertion into Milvus
-    data = []
-    for i, entry in enumerate(tqdm(transcription, desc="Creating embeddings")):
-        text = entry["text"]
-        timestamp = entry["timestamp"]
-        embedding = emb_text(text)
-        
-        # Ensure embedding is valid
-        if len(embedding) == embedding_dim:
-            data.append({
-                "id": i,
-                "vector": embedding,
-                "text": text,
-                "timestamp": timestamp  # Include timestamp in data for RAG retrieval
-            })
-        else:
-            print(f"Skipping entry {i} due to empty or malformed embedding")
-    
-    # Ensure the number of rows is correct
-    if len(data) != len(transcription):
-        print(f"Warning: Data length mismatch! {len(data)} embeddings were inserted out of {len(transcription)} total entries.")
-    
-    # Insert data into Milvus
-    print("All embeddings created successfully.")
-    print(f"Total embeddings: {len(data)}")
+    # Keep the existing collection and only embed new or changed segments
+    ensure_collection(milvus_client, collection_name, embedding_dim, manifest, rebuild=rebuild,
+                      lexical_index=lexical_index)
+    # Merge short Whisper segments into denser chunks that keep their timestamp range
+    rows = merge_transcript_segments(transcription)
+    ingest_document(milvus_client, collection_name, embedding_engine, manifest, transcription_file, rows, lexical_index)
+    return milvus_client, lexical_index
+
+def main():
+    # Load transcription with timestamps
+    output_file = default_transcript_path()
+    collection_name = "my_rag_collection"
     
-    if len(data) > 0:
-        milvus_client.insert(collection_name=collection_name, data=data)
-        print("RAG data updated successfully.")
-    else:
-        print("No valid embeddings to insert.")
+    # Pass --rebuild to start over instead of ingesting incrementally
+    milvus_client, lexical_index = ingest_transcription(output_file, collection_name=collection_name,
+                                                        rebuild="--rebuild" in sys.argv)
+    # Dense and BM25 hits fused, so exact names and terms are found as well
+    retriever = HybridRetriever(milvus_client, collection_name, lexical_index, output_fields=["text", "timestamp"])
+    print("RAG data updated successfully.")
     
     SYSTEM_PROMPT = """
     Human: You are an AI assistant. You are able to find answers to the questions from the contextual passage snippets provided.
@@ -80,24 +64,11 @@ def main():
             print("Goodbye!")
             break
         
-        # Search the Milvus collection using the embedding of the user's query
-        search_res = milvus_client.search(
-            collection_name=collection_name,
-            data=[emb_text(user_query)],
-            limit=3,
-            search_params={"metric_type": "IP", "params": {}},
-            output_fields=["text", "timestamp"],  # Include timestamp in the search results
-        )
+        # Search the collection with both the embedding and the words of the user's query
+        hits = retriever.search([user_query], [emb_text(user_query)], top_k=3)[0]
         
-        # Collect the retrieved text and timestamps from search results
-        retrieved_lines = []
-        timestamps = []
-        for res in search_res[0]:  # Iterate over the first result (as we are limiting the search to 3)
-            retrieved_lines.append(res["entity"]["text"])
-            timestamps.append(res["entity"]["timestamp"])
-        
-        # Prepare context with timestamps
-        context = "\n".join([f"[{timestamps[i]}] {retrieved_lines[i]}" for i in range(len(retrieved_lines))])
+        # Prepare context with timestamps, trimmed to a token budget to keep the prompt small
+        context = build_context(hits, token_budget=600, render=lambda hit: f"[{hit['timestamp']}] {hit['text']}")
         
         # Format the user prompt for the assistant
         USER_PROMPT = f"""
@@ -110,17 +81,14 @@ def main():
         </question>
         """
         
-        # Query Ollama for the response
-        response = ollama.chat(
-            model="llama3.2",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": USER_PROMPT},
-            ],
-        )
-        
-        # Output the AI's response
-        print("AI:", response["message"]["content"])
+        # Query Ollama for the response and print it as it streams in
+        print("AI: ", end="", flush=True)
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": USER_PROMPT},
+        ]
+        collect(stream_chat(messages, model="llama3.2"), on_token=print_token)
+        print()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,344 @@
+import atexit
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+from collection_scan import parse_id_filter
+
+# In-process vector index for collections small enough to scan (a few thousand
+# to a few hundred thousand chunks), usable wherever a MilvusClient is: it
+# implements the has_collection / create_collection / upsert / delete / search /
+# query / get subset the ingestion and retrieval code calls.
+#
+# Every collection keeps its vectors twice: a quantized copy (int8 with one
+# scale per row, or float16) that search scans with one matrix product per
+# block for all queries at once, and the float32 originals used only to rescore
+# the best 'rescore_factor * limit' candidates exactly. Both live in a single
+# file that is memory-mapped on open, so resident memory is mostly the quantized
+# matrix: a quarter (int8) or half (float16) of a float32 copy.
+#
+# Writes are held in memory and merged on the next search: new rows are
+# appended and the rows they replace (or that were deleted) are only marked
+# dead, so a merge never re-encodes the stored rows. flush() and close() write
+# the whole file again atomically, leaving the dead rows out; callers flush
+# once per ingestion run, not per document.
+
+INDEX_SUFFIX = ".npvec"
+QUANTIZATIONS = ("int8", "float16")
+MAGIC = b"ZETAVEC1"
+ALIGNMENT = 64
+
+
+def is_numpy_index_path(uri):
+    return uri.endswith(INDEX_SUFFIX)
+
+
+def quantize(vectors, quantization="int8"):
+    """
+    Quantize float32 row vectors. Returns (codes, scales); scales is None for float16.
+    """
+    if quantization == "float16":
+        return vectors.astype(np.float16), None
+    if quantization != "int8":
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}.")
+    scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.empty(0, dtype=np.float32)
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def _row_fields(arrays, index):
+    offsets = arrays["field_offsets"]
+    return json.loads(arrays["field_bytes"][offsets[index]:offsets[index + 1]].tobytes())
+
+
+def _pack_rows(rows):
+    encoded = [json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for row in rows]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class _Collection:
+    """
+    Arrays of one collection plus the writes not merged into them yet.
+    """
+
+    def __init__(self, dimension, quantization, arrays=None):
+        self.dimension = dimension
+        self.quantization = quantization
+        if arrays is None:
+            arrays = {
+                "ids": np.empty(0, dtype=np.int64),
+                "vectors": np.empty((0, dimension), dtype=np.float32),
+                "field_bytes": np.empty(0, dtype=np.uint8),
+                "field_offsets": np.zeros(1, dtype=np.int64),
+            }
+            arrays["codes"], scales = quantize(arrays["vectors"], quantization)
+            if scales is not None:
+                arrays["scales"] = scales
+        # Tombstones; not saved, since saving drops the dead rows
+        arrays.setdefault("live", np.ones(len(arrays["ids"]), dtype=bool))
+        self.arrays = arrays
+        self.upserted = {}
+        self.deleted = set()
+
+    def __len__(self):
+        return len(self.arrays["ids"])
+
+    @property
+    def dirty(self):
+        return bool(self.upserted or self.deleted)
+
+    def merge(self):
+        """
+        Fold pending upserts and deletes into the arrays: replaced and deleted
+        rows are marked dead, new rows are appended (only they are quantized).
+        """
+        if not self.dirty:
+            return
+        old = self.arrays
+        replaced = np.fromiter(self.deleted | set(self.upserted), dtype=np.int64)
+        live = old["live"] & ~np.isin(old["ids"], replaced)
+        rows = list(self.upserted.values())
+        arrays = {**old, "live": live}
+        if rows:
+            vectors = np.array([row["vector"] for row in rows], dtype=np.float32).reshape(len(rows), self.dimension)
+            codes, scales = quantize(vectors, self.quantization)
+            field_bytes, field_offsets = _pack_rows(
+                [{key: value for key, value in row.items() if key not in ("id", "vector")} for row in rows]
+            )
+            arrays.update(
+                ids=np.concatenate([old["ids"], np.array([row["id"] for row in rows], dtype=np.int64)]),
+                vectors=np.concatenate([old["vectors"], vectors]),
+                codes=np.concatenate([old["codes"], codes]),
+                field_bytes=np.concatenate([old["field_bytes"], field_bytes]),
+                field_offsets=np.concatenate([old["field_offsets"], old["field_offsets"][-1] + field_offsets[1:]]),
+                live=np.concatenate([live, np.ones(len(rows), dtype=bool)]),
+            )
+            if scales is not None:
+                arrays["scales"] = np.concatenate([old["scales"], scales])
+        self.arrays = arrays
+        self.upserted = {}
+        self.deleted = set()
+
+    def compacted_arrays(self):
+        """
+        The merged arrays without their dead rows (field bytes are sliced, not re-encoded).
+        """
+        self.merge()
+        live = self.arrays["live"]
+        if live.all():
+            return {key: array for key, array in self.arrays.items() if key != "live"}
+        keep = np.flatnonzero(live)
+        offsets = np.asarray(self.arrays["field_offsets"])
+        lengths = np.diff(offsets)
+        field_offsets = np.zeros(len(keep) + 1, dtype=np.int64)
+        np.cumsum(lengths[keep], out=field_offsets[1:])
+        arrays = {
+            key: self.arrays[key][keep]
+            for key in ("ids", "vectors", "codes", "scales") if key in self.arrays
+        }
+        arrays["field_bytes"] = np.asarray(self.arrays["field_bytes"])[np.repeat(live, lengths)]
+        arrays["field_offsets"] = field_offsets
+        return arrays
+
+
+class NumpyVectorClient:
+    """
+    Drop-in replacement for the MilvusClient methods this project uses, backed
+    by quantized NumPy matrices saved to a single file at 'path'. Only
+    inner-product collections are supported, like everywhere else here, and
+    query() only understands the id-range filters of collection_scan.
+    """
+
+    supports_filter_expressions = False
+
+    def __init__(self, path, quantization="int8", rescore_factor=4, block_rows=4096):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}.")
+        self.path = path
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.block_rows = block_rows
+        self.collections = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+        atexit.register(self.close)
+
+    def _load(self):
+        with open(self.path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a vector index file.")
+            (header_size,) = struct.unpack("<Q", file.read(8))
+            header = json.loads(file.read(header_size))
+        self.collections = {}
+        for name, entry in header["collections"].items():
+            arrays = {}
+            for key, (offset, dtype, shape) in entry["arrays"].items():
+                if 0 in shape:
+                    arrays[key] = np.empty(shape, dtype=dtype)
+                else:
+                    arrays[key] = np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=tuple(shape))
+            self.collections[name] = _Collection(entry["dimension"], entry["quantization"], arrays)
+
+    def _save(self):
+        header = {"collections": {}}
+        layout = []
+        position = 0
+        for name, collection in self.collections.items():
+            entry = {"dimension": collection.dimension, "quantization": collection.quantization, "arrays": {}}
+            for key, array in collection.compacted_arrays().items():
+                entry["arrays"][key] = [position, array.dtype.str, list(array.shape)]
+                layout.append((position, array))
+                position += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+            header["collections"][name] = entry
+        # Offsets are relative to the data section until the header size is known;
+        # leave room for each of them to grow when made absolute
+        encoded = json.dumps(header).encode("utf-8")
+        data_start = -(-(len(MAGIC) + 8 + len(encoded) + 20 * len(layout)) // ALIGNMENT) * ALIGNMENT
+        for entry in header["collections"].values():
+            for value in entry["arrays"].values():
+                value[0] += data_start
+        encoded = json.dumps(header).encode("utf-8")
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(MAGIC + struct.pack("<Q", len(encoded)) + encoded)
+            for offset, array in layout:
+                file.seek(data_start + offset)
+                file.write(np.ascontiguousarray(array).tobytes())
+            file.truncate(data_start + position)
+        os.replace(tmp_path, self.path)
+        # Reopen memory-mapped, releasing the merged in-memory copies
+        self._load()
+        self._dirty = False
+
+    def has_collection(self, collection_name):
+        return collection_name in self.collections
+
+    def create_collection(self, collection_name, dimension, metric_type="IP", **kwargs):
+        if metric_type != "IP":
+            raise ValueError("The NumPy index only supports inner-product search.")
+        with self._lock:
+            self.collections[collection_name] = _Collection(dimension, self.quantization)
+            self._save()
+
+    def drop_collection(self, collection_name):
+        with self._lock:
+            if self.collections.pop(collection_name, None) is not None:
+                self._save()
+
+    def upsert(self, collection_name, data):
+        with self._lock:
+            collection = self.collections[collection_name]
+            for row in data:
+                collection.deleted.discard(row["id"])
+                collection.upserted[row["id"]] = row
+            self._dirty = True
+        return {"upsert_count": len(data)}
+
+    insert = upsert
+
+    def delete(self, collection_name, ids):
+        with self._lock:
+            collection = self.collections[collection_name]
+            for row_id in ids:
+                collection.upserted.pop(row_id, None)
+                collection.deleted.add(row_id)
+            self._dirty = True
+        return {"delete_count": len(ids)}
+
+    def flush(self, collection_name=None):
+        """
+        Write pending changes to disk.
+        """
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def close(self):
+        self.flush()
+
+    def _snapshot(self, collection_name):
+        with self._lock:
+            collection = self.collections[collection_name]
+            collection.merge()
+            return collection, collection.arrays
+
+    def _approximate_scores(self, arrays, queries):
+        # One matrix product per block of rows, so at most one block is dequantized at a time
+        codes, scales = arrays["codes"], arrays.get("scales")
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), self.block_rows):
+            block = np.asarray(codes[start:start + self.block_rows], dtype=np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if scales is not None:
+            scores *= scales
+        return scores
+
+    def search(self, collection_name, data, limit=10, output_fields=None, **kwargs):
+        collection, arrays = self._snapshot(collection_name)
+        queries = np.asarray(data, dtype=np.float32).reshape(-1, collection.dimension)
+        count = len(arrays["ids"])
+        live = arrays["live"]
+        live_count = int(live.sum())
+        if live_count == 0 or limit <= 0:
+            return [[] for _ in queries]
+        limit = min(limit, live_count)
+        candidates = min(live_count, limit * self.rescore_factor)
+        scores = self._approximate_scores(arrays, queries)
+        if live_count < count:
+            # Dead rows sort last, and there are at least 'candidates' live ones
+            scores[:, ~live] = -np.inf
+        if candidates < count:
+            shortlist = np.argpartition(-scores, candidates - 1, axis=1)[:, :candidates]
+        else:
+            shortlist = np.broadcast_to(np.arange(count), (len(queries), count))
+        # Exact rescoring reads only the shortlisted float32 rows from the mapped file
+        rows = np.unique(shortlist)
+        exact = queries @ np.asarray(arrays["vectors"][rows]).T
+        columns = np.searchsorted(rows, shortlist)
+        exact = np.take_along_axis(exact, columns, axis=1)
+        order = np.argsort(-exact, axis=1, kind="stable")[:, :limit]
+        results = []
+        for query_index, query_order in enumerate(order):
+            hits = []
+            for position in query_order:
+                index = int(shortlist[query_index, position])
+                hits.append({
+                    "id": int(arrays["ids"][index]),
+                    "distance": float(exact[query_index, position]),
+                    "entity": self._entity(arrays, index, output_fields),
+                })
+            results.append(hits)
+        return results
+
+    def _entity(self, arrays, index, output_fields):
+        if not output_fields:
+            return {}
+        fields = _row_fields(arrays, index)
+        fields["id"] = int(arrays["ids"][index])
+        if "vector" in output_fields:
+            fields["vector"] = np.asarray(arrays["vectors"][index]).tolist()
+        return {field: fields.get(field) for field in output_fields}
+
+    def query(self, collection_name, filter="", output_fields=None, limit=None, **kwargs):
+        matches = parse_id_filter(filter)
+        _, arrays = self._snapshot(collection_name)
+        ids = np.asarray(arrays["ids"])
+        selected = np.flatnonzero(arrays["live"] & matches(ids))
+        selected = selected[np.argsort(ids[selected], kind="stable")][:limit]
+        fields = output_fields or ["id"]
+        return [self._entity(arrays, int(index), fields) for index in selected]
+
+    def get(self, collection_name, ids, output_fields=None, **kwargs):
+        _, arrays = self._snapshot(collection_name)
+        wanted = np.asarray(list(ids), dtype=np.int64)
+        selected = np.flatnonzero(arrays["live"] & np.isin(arrays["ids"], wanted))
+        fields = ["id", *(output_fields or [])]
+        return [self._entity(arrays, int(index), fields) for index in selected]
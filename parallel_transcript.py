@@ -0,0 +1,174 @@
+import argparse
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from registry import get_whisper_model
+from telemetry import span
+from transcript_store import save_transcript_store, segments_from_whisper
+from transcript import (
+    SAMPLE_RATE,
+    format_timestamp,
+    iter_audio_blocks,
+    iter_audio_windows,
+    save_transcription_to_file,
+)
+
+_worker_model = None
+
+
+def plan_shards(audio_files, shard_seconds=300.0):
+    """
+    Split each file into silence-aligned shards of at most 'shard_seconds'.
+
+    Returns:
+        List of (audio_path, shard_index, start_seconds, end_seconds) tuples.
+    """
+    shards = []
+    for audio_path in audio_files:
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"The file {audio_path} does not exist.")
+        # Only the cut points are kept; the samples are dropped as soon as they are scanned
+        windows = iter_audio_windows(audio_path, window_seconds=shard_seconds, search_seconds=10.0)
+        for index, (start, samples) in enumerate(windows):
+            shards.append((audio_path, index, start, start + len(samples) / SAMPLE_RATE))
+    return shards
+
+
+def load_audio_range(audio_path, start, end):
+    """
+    Decode [start, end) seconds of 'audio_path' as 16 kHz mono float32 samples.
+    """
+    wanted = int(round((end - start) * SAMPLE_RATE))
+    blocks, loaded = [], 0
+    for block in iter_audio_blocks(audio_path, start=start):
+        blocks.append(block[:wanted - loaded])
+        loaded += len(blocks[-1])
+        if loaded >= wanted:
+            break
+    return np.concatenate(blocks) if blocks else np.empty(0, dtype=np.float32)
+
+
+def _init_worker(model_size, threads_per_worker):
+    global _worker_model
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    _worker_model = get_whisper_model(model_size)
+
+
+def _transcribe_shard(shard):
+    audio_path, index, start, end = shard
+    began = time.perf_counter()
+    samples = load_audio_range(audio_path, start, end)
+    with span("whisper.transcribe_shard", audio=audio_path, shard=index, audio_seconds=len(samples) / SAMPLE_RATE):
+        result = _worker_model.transcribe(samples, word_timestamps=True)
+    segments = segments_from_whisper(result, words=True)
+    return {
+        "audio_path": audio_path,
+        "index": index,
+        "start": start,
+        "segments": segments,
+        "audio_seconds": len(samples) / SAMPLE_RATE,
+        "elapsed": time.perf_counter() - began,
+        "worker": os.getpid(),
+    }
+
+
+def merge_shard_results(results):
+    """
+    Order shard results per file and shift segment times by each shard's offset.
+
+    Returns:
+        Dict mapping audio path to a list of {"timestamp", "start", "end", "text", "words"} segments.
+    """
+    by_file = defaultdict(list)
+    for result in results:
+        by_file[result["audio_path"]].append(result)
+    transcriptions = {}
+    for audio_path, shard_results in by_file.items():
+        segments = []
+        for result in sorted(shard_results, key=lambda r: r["index"]):
+            offset = result["start"]
+            for segment in result["segments"]:
+                segments.append({
+                    "timestamp": format_timestamp(offset + segment["start"]),
+                    "start": offset + segment["start"],
+                    "end": offset + segment["end"],
+                    "text": segment["text"],
+                    "words": [
+                        {"word": word["word"], "start": offset + word["start"], "end": offset + word["end"]}
+                        for word in segment.get("words", [])
+                    ],
+                })
+        transcriptions[audio_path] = segments
+    return transcriptions
+
+
+def worker_real_time_factors(results):
+    """
+    Real-time factor (processing seconds per audio second) of each worker process.
+    """
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for result in results:
+        totals[result["worker"]][0] += result["elapsed"]
+        totals[result["worker"]][1] += result["audio_seconds"]
+    return {worker: elapsed / audio if audio else 0.0 for worker, (elapsed, audio) in totals.items()}
+
+
+def transcribe_parallel(audio_files, model_size="base", workers=None, shard_seconds=300.0):
+    """
+    Transcribe a batch of audio files on a process pool, one Whisper model per worker.
+
+    Long files are split at silence into shards of at most 'shard_seconds', so a
+    single recording can also use every worker.
+
+    Returns:
+        (transcriptions, real_time_factors): segments per audio path and RTF per worker pid.
+    """
+    workers = workers or os.cpu_count() or 1
+    threads_per_worker = max((os.cpu_count() or 1) // workers, 1)
+    shards = plan_shards(audio_files, shard_seconds)
+    print(f"Transcribing {len(shards)} shards from {len(audio_files)} files on {workers} workers...")
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(model_size, threads_per_worker)) as executor:
+        futures = [executor.submit(_transcribe_shard, shard) for shard in shards]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"Finished {result['audio_path']} shard {result['index']} "
+                  f"(RTF {result['elapsed'] / max(result['audio_seconds'], 1e-9):.2f})")
+
+    real_time_factors = worker_real_time_factors(results)
+    for worker, rtf in sorted(real_time_factors.items()):
+        print(f"Worker {worker}: real-time factor {rtf:.2f}")
+    return merge_shard_results(results), real_time_factors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe audio files in parallel with Whisper.")
+    parser.add_argument("audio_files", nargs="+", help="Audio files to transcribe")
+    parser.add_argument("--model", default="base", help="Whisper model size")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--shard-seconds", type=float, default=300.0, help="Maximum shard length")
+    args = parser.parse_args()
+
+    transcriptions, _ = transcribe_parallel(args.audio_files, args.model, args.workers, args.shard_seconds)
+    for audio_path, transcription in transcriptions.items():
+        base = os.path.splitext(audio_path)[0]
+        save_transcript_store(f"{base}.transcription.npz", transcription)
+        # JSON copy without the word timings, for the scripts that still read it
+        save_transcription_to_file(
+            [{key: value for key, value in segment.items() if key != "words"} for segment in transcription],
+            f"{base}.transcription_with_timestamps.json",
+        )
+
+
+if __name__ == "__main__":
+    main()
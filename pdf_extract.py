@@ -0,0 +1,44 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from telemetry import span
+
+
+def count_pages(file_path):
+    import PyPDF2
+    with open(file_path, "rb") as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def _extract_page_range(file_path, start, end):
+    # Each worker opens the file itself; PdfReader objects do not pickle
+    import PyPDF2
+    with span("pdf.extract", file=file_path, batch_size=end - start), open(file_path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        return [(number + 1, reader.pages[number].extract_text() or "") for number in range(start, end)]
+
+
+def iter_pdf_pages(file_path, workers=None, pages_per_task=8):
+    """
+    Extract the pages of a PDF on a process pool and yield (page number, text)
+    in page order as soon as each range of pages is done. Page numbers start at 1.
+
+    At most two tasks per worker are queued, so a slow consumer (e.g. the
+    embedder) holds extraction back instead of every page piling up in memory.
+    """
+    page_count = count_pages(file_path)
+    workers = workers or min(os.cpu_count() or 1, max(page_count // pages_per_task, 1))
+    if workers == 1:
+        # No pool for small files, or when already running inside a worker
+        for start in range(0, page_count, pages_per_task):
+            yield from _extract_page_range(file_path, start, min(start + pages_per_task, page_count))
+        return
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, page_count, pages_per_task):
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(_extract_page_range, file_path, start, min(start + pages_per_task, page_count)))
+        while pending:
+            yield from pending.popleft().result()
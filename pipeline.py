@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+Stage = namedtuple("Stage", ["name", "func", "deps", "cache"])
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(value):
+    """
+    Stable hash of a stage input. Strings naming an existing file are hashed by
+    the file's content, so a changed file invalidates the stages that read it.
+    """
+    if isinstance(value, str) and os.path.isfile(value):
+        return _file_digest(value)
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+class Pipeline:
+    """
+    Runs stages as a DAG. Each stage receives the outputs of its dependencies as
+    arguments, in memory; stages whose dependencies are done run concurrently.
+    Outputs of cacheable stages are stored as JSON under 'cache_dir', keyed by
+    the stage name and the fingerprint of its inputs, so reruns skip them.
+    """
+
+    def __init__(self, cache_dir=".pipeline_cache", max_workers=4):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.stages = {}
+
+    def add_stage(self, name, func, deps=(), cache=True):
+        self.stages[name] = Stage(name, func, tuple(deps), cache)
+
+    def _cache_path(self, stage, inputs):
+        key = hashlib.sha256("".join(fingerprint(value) for value in inputs).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{stage.name}-{key[:16]}.json")
+
+    def _run_stage(self, stage, inputs):
+        cache_path = self._cache_path(stage, inputs) if stage.cache else None
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as file:
+                print(f"[{stage.name}] cached")
+                return json.load(file)
+        started = time.perf_counter()
+        output = stage.func(*inputs)
+        print(f"[{stage.name}] done in {time.perf_counter() - started:.1f}s")
+        if cache_path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(output, file, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        return output
+
+    def run(self, **initial):
+        """
+        Run every stage. 'initial' provides values for names that are not stages
+        (e.g. the video URL), which stages can list as dependencies too.
+
+        Returns:
+            Dictionary of stage name to output.
+        """
+        results = dict(initial)
+        remaining = {name: stage for name, stage in self.stages.items() if name not in results}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                for name, stage in list(remaining.items()):
+                    if all(dep in results for dep in stage.deps):
+                        inputs = [results[dep] for dep in stage.deps]
+                        running[executor.submit(self._run_stage, stage, inputs)] = name
+                        del remaining[name]
+                if not running:
+                    raise ValueError(f"Stages {sorted(remaining)} can never run (missing inputs).")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        return results
+
+
+def download_stage(url):
+    downloader = importlib.import_module("yt-downloader")
+    # 16 kHz mono, named after the video id, skipped when it is already downloaded
+    paths = downloader.download_batch([url], max_workers=1)
+    if not paths:
+        raise FileNotFoundError(f"Download of {url} did not produce an audio file.")
+    return next(iter(paths.values()))
+
+
+def transcribe_stage(audio_path):
+    from transcript import transcribe_audio_with_timestamps
+    return transcribe_audio_with_timestamps(audio_path, model_size="base")
+
+
+def summary_stage(segments):
+    from chunking import estimate_tokens
+    from summary import SUMMARY_TOKEN_BUDGET, generate_summary, generate_summary_map_reduce
+    text = " ".join(segment["text"] for segment in segments)
+    if estimate_tokens(text) <= SUMMARY_TOKEN_BUDGET:
+        return generate_summary(text)
+    return generate_summary_map_reduce(segments)["summary"]
+
+
+def flashcards_stage(segments):
+    from flash_cards import generate_flashcards_from_segments
+    return [card._asdict() for card in generate_flashcards_from_segments(segments)]
+
+
+DB_PATH = "./milvus_demo.db"
+COLLECTION_NAME = "my_rag_collection"
+
+
+def chapters_stage(ingest_stats, source, db_path=DB_PATH, collection_name=COLLECTION_NAME):
+    from chapter_generation import generate_chapters_from_collection
+    from registry import get_vector_client
+    # Runs after the embeddings stage and reads this lecture's stored vectors back,
+    # so nothing is embedded twice
+    client = get_vector_client(db_path)
+    return list(generate_chapters_from_collection(client, collection_name, doc_id=source))
+
+
+def embed_stage(segments, source, db_path=DB_PATH, collection_name=COLLECTION_NAME):
+    from chunking import merge_transcript_segments
+    from embeddings import EmbeddingEngine
+    from ingestion import IngestionManifest, ensure_collection, ingest_document, manifest_path_for
+    from lexical_index import lexical_index_path_for
+    from registry import get_embedding_cache, get_lexical_index, get_vector_client
+    client = get_vector_client(db_path)
+    embedder = EmbeddingEngine(cache=get_embedding_cache())
+    manifest = IngestionManifest(manifest_path_for(db_path))
+    lexical_index = get_lexical_index(lexical_index_path_for(db_path))
+    ensure_collection(client, collection_name, embedder.dimension(), manifest, lexical_index=lexical_index)
+    rows = merge_transcript_segments(segments)
+    return ingest_document(client, collection_name, embedder, manifest, source, rows, lexical_index)
+
+
+def build_pipeline(from_url=True, cache_dir=".pipeline_cache", max_workers=4):
+    """
+    url -> audio -> transcript -> {embeddings -> chapters, summary, flashcards}
+    """
+    pipeline = Pipeline(cache_dir, max_workers)
+    if from_url:
+        pipeline.add_stage("audio", download_stage, deps=("url",))
+    pipeline.add_stage("transcript", transcribe_stage, deps=("audio",))
+    # Ingestion is incremental and writes to Milvus, so it always runs
+    pipeline.add_stage("embeddings", embed_stage, deps=("transcript", "audio"), cache=False)
+    pipeline.add_stage("summary", summary_stage, deps=("transcript",))
+    pipeline.add_stage("flashcards", flashcards_stage, deps=("transcript",))
+    # The ingestion stats are part of the cache key, so a re-ingested lecture gets new chapters
+    pipeline.add_stage("chapters", chapters_stage, deps=("embeddings", "audio"))
+    return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the whole ZETA AI pipeline in one pass.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--url", help="YouTube video URL to download")
+    source.add_argument("--audio", help="Local audio file to use instead of downloading")
+    parser.add_argument("--cache-dir", default=".pipeline_cache", help="Directory for cached stage outputs")
+    parser.add_argument("--workers", type=int, default=4, help="Number of stages to run at once")
+    parser.add_argument("--output", default="pipeline_output.json", help="Where to save the results")
+    args = parser.parse_args()
+
+    pipeline = build_pipeline(from_url=bool(args.url), cache_dir=args.cache_dir, max_workers=args.workers)
+    results = pipeline.run(url=args.url) if args.url else pipeline.run(audio=args.audio)
+
+    # Keep the transcript files the standalone scripts read
+    from transcript import save_transcription_to_file
+    from transcript_store import DEFAULT_STORE_PATH, save_transcript_store
+    # Always rewritten (times of older cached transcripts come from their display
+    # timestamps), so the scripts never read the store of a previous lecture
+    save_transcript_store(DEFAULT_STORE_PATH, results["transcript"])
+    save_transcription_to_file(results["transcript"], "transcription_with_timestamps.json")
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({name: results[name] for name in ("summary", "flashcards", "chapters")}, file, ensure_ascii=False)
+    print(f"Pipeline results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
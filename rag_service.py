@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import json
+
+import ollama
+
+from conversation_memory import SummarizingMemory
+from rag_with_chatbotp import RAGSystem
+from telemetry import span
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to 'max_wait' seconds (or 'max_batch'
+    items) and hands them to 'process_batch' in one call, run in a worker
+    thread. Each caller gets back its own item of the returned list.
+    """
+
+    def __init__(self, process_batch, max_batch=32, max_wait=0.01):
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                results = await asyncio.to_thread(self.process_batch, [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class RAGService:
+    """
+    Serves RAGSystem to many concurrent users. Query embeddings and hybrid
+    searches of concurrent requests are micro-batched, the number of in-flight
+    Ollama chats is capped by a semaphore, and every session keeps its own
+    conversation history.
+    """
+
+    def __init__(self, rag, max_concurrent_chats=4, max_batch=32, max_wait=0.01, top_k=3, model="llama3.2"):
+        self.rag = rag
+        self.model = model
+        self.top_k = top_k
+        self.sessions = {}
+        self.chat_slots = asyncio.Semaphore(max_concurrent_chats)
+        self.retriever = MicroBatcher(self._retrieve_batch, max_batch, max_wait)
+        self.chat_client = ollama.AsyncClient()
+
+    def _memory(self, session_id):
+        if session_id not in self.sessions:
+            self.sessions[session_id] = SummarizingMemory()
+        return self.sessions[session_id]
+
+    def _retrieve_batch(self, queries):
+        vectors = self.rag.embedder.embed(queries)
+        return list(zip(vectors, self.rag.search(queries, vectors, self.top_k)))
+
+    async def answer(self, session_id, query):
+        vector, context = await self.retriever.submit(query)
+        scope, version = self.rag.answer_scope, self.rag.manifest.version()
+        history = self._memory(session_id).render()
+        # Follow-ups depend on the conversation, so only fresh sessions use the cache
+        answer = None if history else self.rag.answer_cache.lookup(scope, vector, version)
+        if answer is None:
+            if not context.strip():
+                return "No relevant data found in the database for your query."
+            messages = self.rag.build_messages(query, context, history)
+            async with self.chat_slots:
+                with span("ollama.chat", model=self.model) as current:
+                    response = await self.chat_client.chat(model=self.model, messages=messages)
+                    current.set(tokens=response.get("eval_count") or 0)
+            answer = response["message"]["content"]
+            if not history:
+                self.rag.answer_cache.store(scope, vector, answer, version)
+        self._memory(session_id).add_turn(query, answer)
+        return answer
+
+    def reset(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self._route(method, path, body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if method != "POST" or path not in ("/query", "/reset"):
+            return "404 Not Found", {"error": "Use POST /query or POST /reset."}
+        try:
+            request = json.loads(body or b"{}")
+            session_id = str(request.get("session_id", "default"))
+            if path == "/reset":
+                self.reset(session_id)
+                return "200 OK", {"session_id": session_id, "reset": True}
+            answer = await self.answer(session_id, request["query"])
+            return "200 OK", {"session_id": session_id, "answer": answer}
+        except (KeyError, json.JSONDecodeError) as e:
+            return "400 Bad Request", {"error": f"Invalid request: {e}"}
+        except Exception as e:
+            return "500 Internal Server Error", {"error": str(e)}
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        batcher = asyncio.create_task(self.retriever.run())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"RAG service listening on http://{host}:{port} (POST /query, POST /reset)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the RAG chatbot over HTTP for concurrent users.")
+    parser.add_argument("--db-path", default="./milvus_rag.db",
+                        help="Milvus Lite file or server URI, or a .npvec file for the in-process NumPy index")
+    parser.add_argument("--collection", default="my_rag_collection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-concurrent-chats", type=int, default=4)
+    parser.add_argument("--stub-ollama", action="store_true", help="Answer with a local Ollama stand-in (for load tests)")
+    args = parser.parse_args()
+
+    if args.stub_ollama:
+        import os
+        from stub_ollama import start_stub_server
+        stub = start_stub_server()
+        os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{stub.server_port}"
+        print(f"Using stub Ollama at {os.environ['OLLAMA_HOST']}")
+
+    rag = RAGSystem(db_path=args.db_path, collection_name=args.collection)
+    asyncio.run(RAGService(rag, args.max_concurrent_chats).serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,99 @@
-from glob import glob
-import ollama
-from pymilvus import MilvusClient
-from tqdm import tqdm
+import argparse
 import json
 import os
-import PyPDF2  
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import HumanMessage, AIMessage  
+from bulk_ingest import bulk_ingest, checkpoint_path_for
+from chunking import chunk_pages, chunk_text
+from conversation_memory import SummarizingMemory
+from embeddings import EmbeddingEngine
+from pdf_extract import iter_pdf_pages
+from llm import collect, print_token, stream_chat
+from ingestion import IngestionManifest, answer_cache_scope, ensure_collection, ingest_document, manifest_path_for
+from lexical_index import lexical_index_path_for
+from registry import get_embedding_cache, get_lexical_index, get_vector_client, get_semantic_cache
+from retrieval import HybridRetriever, build_context
+from telemetry import span
 
 
 os.environ["CUDA_VISIBLE_DEVICES"] = "0" 
 
 class RAGSystem:
-    def __init__(self, db_path="./milvus_rag.db", collection_name="rag_collection"):
+    def __init__(self, db_path="./milvus_rag.db", collection_name="rag_collection", rebuild=False, context_tokens=600):
         print("Initializing Milvus client with GPU support...")
-        self.client = MilvusClient(uri=db_path)
+        self.db_path = db_path
+        self.client = get_vector_client(db_path)
         self.collection_name = collection_name
-        self.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-        self._init_collection()
+        self.memory = SummarizingMemory()
+        self.embedder = EmbeddingEngine(cache=get_embedding_cache())
+        self.manifest = IngestionManifest(manifest_path_for(db_path))
+        self.answer_cache = get_semantic_cache()
+        self.answer_scope = answer_cache_scope(self.manifest, collection_name)
+        # BM25 next to the collection, fused with the dense hits at query time
+        self.lexical_index = get_lexical_index(lexical_index_path_for(db_path))
+        self.retriever = HybridRetriever(self.client, collection_name, self.lexical_index)
+        self.context_tokens = context_tokens
+        self._init_collection(rebuild)
         
-    def _init_collection(self):
-        
-        if self.client.has_collection(self.collection_name):
-            print(f"Collection '{self.collection_name}' exists. Dropping it.")
-            self.client.drop_collection(self.collection_name)
-        else:
-            print(f"Collection '{self.collection_name}' does not exist. Creating a new one.")
-            
-       
-        test_embedding = self._generate_embeddings("Test")
-        embedding_dim = len(test_embedding)
-        self.client.create_collection(
-            collection_name=self.collection_name,
-            dimension=embedding_dim,
-            metric_type="IP",
-            consistency_level="Strong"
-        )
+    def _init_collection(self, rebuild=False):
+        embedding_dim = self.embedder.dimension()
+        ensure_collection(self.client, self.collection_name, embedding_dim, self.manifest, rebuild=rebuild,
+                          lexical_index=self.lexical_index, checkpoint_path=checkpoint_path_for(self.db_path))
         print(f"Collection '{self.collection_name}' is ready.")
     
     def _generate_embeddings(self, text: str) -> list[float]:
-
-
-        
-        response = ollama.embeddings(
-            model="mxbai-embed-large", 
-            prompt=text
-        )
-        return response["embedding"]
+        return self.embedder.embed_one(text)
     
-    def _text_to_chunks(self, text: str, chunk_size: int = 512) -> list[str]:
-        return [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
+    def _text_to_chunks(self, text: str, target_tokens: int = 200, overlap_tokens: int = 40) -> list[str]:
+        # Sentence-aligned chunks with overlap instead of fixed character slices
+        return list(chunk_text(text, target_tokens, overlap_tokens))
     
-    def ingest_data(self, text: str):
+    def ingest_data(self, text: str, doc_id: str = "default") -> dict:
         print("Starting data ingestion...")
-        chunks = self._text_to_chunks(text)
-        data = []
-        for idx, chunk in enumerate(tqdm(chunks, desc="Processing chunks")):
-            data.append({
-                "id": id(text) + idx,  
-                "vector": self._generate_embeddings(chunk),
-                "text": chunk
-            })
-        self.client.insert(
-            collection_name=self.collection_name,
-            data=data
-        )
+        rows = [{"text": chunk} for chunk in self._text_to_chunks(text)]
+        stats = ingest_document(self.client, self.collection_name, self.embedder, self.manifest, doc_id, rows, self.lexical_index)
+        print("Data ingestion complete.")
+        return stats
+    
+    def ingest_pdf(self, file_path: str) -> dict:
+        """
+        Stream a PDF into the collection: pages are extracted in parallel and
+        chunked and embedded as they arrive. Chunks keep their page numbers.
+        """
+        print(f"Starting ingestion of {file_path}...")
+        rows = chunk_pages(iter_pdf_pages(file_path))
+        stats = ingest_document(self.client, self.collection_name, self.embedder, self.manifest, file_path, rows, self.lexical_index)
         print("Data ingestion complete.")
+        return stats
+    
+    def ingest_paths(self, sources: list[str], workers: int = None) -> dict:
+        """
+        Bulk-ingest the PDFs and transcripts under 'sources' (directories or
+        glob patterns), resuming from the checkpoint of an interrupted run.
+        """
+        return bulk_ingest(sources, self.client, self.collection_name, self.embedder, self.manifest,
+                           checkpoint_path_for(self.db_path), workers=workers, lexical_index=self.lexical_index)
     
     def retrieve_context(self, query: str, top_k: int = 3) -> str:
-        
-        results = self.client.search(
-            collection_name=self.collection_name,
-            data=[self._generate_embeddings(query)],
-            limit=top_k,
-            output_fields=["text"]
-        )
-        if not results or not results[0]:
-            return ""
-        return "\n".join(
-            [hit["entity"]["text"] for hit in results[0]]
-        )
+        return self.retrieve_contexts([query], top_k)[0]
     
-    def generate_response(self, query: str) -> str:
-        
-        context = self.retrieve_context(query)
-        if not context.strip():
-            return "No relevant data found in the database for your query."
-        
-        
-        chat_history = "\n".join(
-            [f"{'Human' if isinstance(msg, HumanMessage) else 'AI'}: {msg.content}" 
-             for msg in self.memory.load_memory_variables({}).get("chat_history", [])]
-        )
-        
-       
+    def retrieve_contexts(self, queries: list[str], top_k: int = 3) -> list[str]:
+        """
+        Retrieve the context for several queries at once: the queries are
+        embedded in one batch and searched with a single multi-vector search.
+        """
+        return self.search(queries, self.embedder.embed(queries), top_k)
+    
+    def search(self, queries: list[str], vectors: list[list[float]], top_k: int = 3) -> list[str]:
+        """
+        Hybrid BM25 + dense search; each context is trimmed to 'context_tokens'.
+        """
+        with span("rag.search", batch_size=len(queries), top_k=top_k):
+            return [
+                build_context(hits, self.context_tokens)
+                for hits in self.retriever.search(queries, vectors, top_k)
+            ]
+    
+    @staticmethod
+    def build_messages(query: str, context: str, chat_history: str) -> list[dict]:
         messages = []
         if chat_history:
             messages.append({
@@ -108,45 +108,77 @@ class RAGSystem:
             "role": "user",
             "content": query
         })
+        return messages
+    
+    def generate_response(self, query: str) -> str:
+        return "".join(self.stream_response(query))
+    
+    def stream_response(self, query: str):
+        """
+        Yield the answer token by token as the model generates it. The full
+        answer is added to the conversation memory once the stream ends.
+        Answers to (near-)repeated questions come from the semantic cache.
+        """
+        query_vector = self._generate_embeddings(query)
+        # Recent turns verbatim plus a rolling summary of older ones, cached between turns
+        chat_history = self.memory.render()
+        # Only answers that do not depend on earlier turns are safe to reuse,
+        # so follow-up questions never hit the cache
+        if not chat_history:
+            cached = self.answer_cache.lookup(self.answer_scope, query_vector, self.manifest.version())
+            if cached is not None:
+                yield cached
+                self._remember(query, cached)
+                return
         
-       
-        response = ollama.chat(
-            model="llama3.2",
-            messages=messages
-        )
+        context = self.search([query], [query_vector])[0]
+        if not context.strip():
+            yield "No relevant data found in the database for your query."
+            return
         
-        generated_response = response["message"]["content"]
+        messages = self.build_messages(query, context, chat_history)
         
-       
-        self.memory.chat_memory.add_user_message(query)
-        self.memory.chat_memory.add_ai_message(generated_response)
+        parts = []
+        for token in stream_chat(messages, model="llama3.2"):
+            parts.append(token)
+            yield token
+        generated_response = "".join(parts)
         
-        return generated_response
+        if not chat_history:
+            self.answer_cache.store(self.answer_scope, query_vector, generated_response, self.manifest.version())
+        self._remember(query, generated_response)
+    
+    def _remember(self, query: str, answer: str):
+        self.memory.add_turn(query, answer)
 
 def extract_text_from_pdf(file_path):
     print("Extracting text from PDF...")
-    with open(file_path, "rb") as file:
-        reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text
-    return text
+    return "".join(text for _, text in iter_pdf_pages(file_path))
 
 def main():
-    file_path = "/home/lenin/Downloads/402_IT_X.pdf" # give your desired input in this case i have chosen pdf file 
-    if not os.path.exists(file_path):
-        print(f"File not found: {file_path}")
-        return
+    parser = argparse.ArgumentParser(description="Chat with your documents.")
+    parser.add_argument("sources", nargs="*", help="Directories or glob patterns of PDFs and transcripts to ingest first")
+    parser.add_argument("--workers", type=int, default=None, help="Number of extraction worker processes")
+    parser.add_argument("--db-path", default="./milvus_rag.db",
+                        help="Milvus Lite file or server URI, or a .npvec file for the in-process NumPy index")
+    args = parser.parse_args()
     
-    extracted_text = extract_text_from_pdf(file_path)
+    file_path = "/home/lenin/Downloads/402_IT_X.pdf" # give your desired input in this case i have chosen pdf file 
     
     print("Initializing RAG system...")
-    rag = RAGSystem(collection_name="my_rag_collection")
+    rag = RAGSystem(db_path=args.db_path, collection_name="my_rag_collection")
     
-    print("Ingesting extracted text into the database...")
-    rag.ingest_data(extracted_text)
+    if args.sources:
+        # Bulk mode: many files on a worker pool, resumable from the checkpoint file
+        rag.ingest_paths(args.sources, workers=args.workers)
+    elif os.path.exists(file_path):
+        # Pages are extracted, chunked and embedded as a stream
+        print("Ingesting the PDF into the database...")
+        rag.ingest_pdf(file_path)
+    elif not rag.manifest.documents(rag.collection_name):
+        print(f"File not found: {file_path}")
+        return
+    # Otherwise chat over what an earlier run (or 'zeta.py ingest') already stored
     
     print("\nSetup complete. Chatbot ready! Type your question (or 'exit' to quit):")
     while True:
@@ -154,9 +186,9 @@ def main():
         if user_query.lower() in ['exit', 'quit']:
             print("Exiting chatbot.")
             break
-        response = rag.generate_response(user_query)
         print("Response:")
-        print(response)
+        collect(rag.stream_response(user_query), on_token=print_token)
+        print()
         print("-" * 50)
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+import threading
+
+# Process-wide cache of expensive resources (models, database clients, HTTP sessions).
+# Each resource is created lazily on first use and then shared by every caller.
+# Factories run under a lock of their own key only, so loading Whisper does not hold
+# up a caller that just wants the HTTP session, and a factory may fetch other resources.
+_resources = {}
+_key_locks = {}
+_lock = threading.Lock()
+
+
+def get_resource(key, factory):
+    """
+    Return the resource registered under 'key', creating it with 'factory()' on first use.
+    """
+    resource = _resources.get(key)
+    if resource is None:
+        with _lock:
+            key_lock = _key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            resource = _resources.get(key)
+            if resource is None:
+                resource = factory()
+                with _lock:
+                    _resources[key] = resource
+    return resource
+
+
+def clear_resources():
+    """
+    Forget every registered resource (e.g. in a forked worker or between benchmark runs).
+    """
+    with _lock:
+        _resources.clear()
+        _key_locks.clear()
+
+
+def get_whisper_model(model_size="base"):
+    def factory():
+        from transcript import load_whisper_model
+        return load_whisper_model(model_size)
+    return get_resource(("whisper", model_size), factory)
+
+
+def get_milvus_client(uri):
+    def factory():
+        from pymilvus import MilvusClient
+        return MilvusClient(uri=uri)
+    return get_resource(("milvus", uri), factory)
+
+
+def get_vector_client(uri):
+    """
+    Vector store for 'uri': the in-process NumPy index for paths ending in
+    ".npvec", Milvus (Lite file or server) for anything else.
+    """
+    from numpy_index import is_numpy_index_path
+    if not is_numpy_index_path(uri):
+        return get_milvus_client(uri)
+
+    def factory():
+        from numpy_index import NumpyVectorClient
+        return NumpyVectorClient(uri)
+    return get_resource(("numpy_index", uri), factory)
+
+
+def get_ollama_client():
+    """
+    Shared Ollama client. Created on first use, so OLLAMA_HOST can still be
+    changed (e.g. to point at a stub server) after the modules are imported.
+    """
+    def factory():
+        import ollama
+        return ollama.Client()
+    return get_resource(("ollama",), factory)
+
+
+def get_http_session(pool_size=16):
+    """
+    Shared requests session with keep-alive connection pooling.
+    """
+    def factory():
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    return get_resource(("http_session",), factory)
+
+
+def get_semantic_cache():
+    """
+    Process-wide answer cache shared by the chatbot and the ingestion code that invalidates it.
+    """
+    def factory():
+        from semantic_cache import SemanticCache
+        return SemanticCache()
+    return get_resource(("semantic_cache",), factory)
+
+
+def get_lexical_index(path):
+    def factory():
+        from lexical_index import BM25Index
+        return BM25Index(path)
+    return get_resource(("lexical_index", path), factory)
+
+
+def get_embedding_cache(path=None):
+    def factory():
+        from embedding_cache import DEFAULT_CACHE_PATH, EmbeddingCache
+        return EmbeddingCache(path or DEFAULT_CACHE_PATH)
+    return get_resource(("embedding_cache", path), factory)
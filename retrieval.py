@@ -0,0 +1,76 @@
+from collections import defaultdict
+
+from chunking import estimate_tokens
+from telemetry import span
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Merge several rankings of ids into one: every id scores 1 / (k + rank) in
+    each ranking it appears in. Only ranks are used, so BM25 and inner-product
+    scores never have to be put on the same scale.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def build_context(hits, token_budget=600, render=lambda hit: hit["text"]):
+    """
+    Join rendered hits, best first, until 'token_budget' tokens are used. The
+    best hit is always included (cut to the budget if it is longer).
+    """
+    lines, used = [], 0
+    for hit in hits:
+        line = render(hit)
+        tokens = estimate_tokens(line)
+        if used + tokens > token_budget:
+            if not lines:
+                lines.append(line[:token_budget * 4])
+            break
+        lines.append(line)
+        used += tokens
+    return "\n".join(lines)
+
+
+class HybridRetriever:
+    """
+    Dense Milvus search and the BM25 index queried side by side, with the two
+    rankings merged by reciprocal-rank fusion.
+
+    Each retriever contributes 'candidates' hits; exact terms such as names or
+    course codes are found by BM25 even when their embedding is not close.
+    """
+
+    def __init__(self, client, collection_name, lexical_index, output_fields=("text",), candidates=10, rrf_k=60):
+        self.client = client
+        self.collection_name = collection_name
+        self.lexical_index = lexical_index
+        self.output_fields = list(output_fields)
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+
+    def search(self, queries, vectors, top_k=3):
+        """
+        Return, for each query, its 'top_k' fused hits as {"id", "text", ...} dicts.
+        """
+        limit = max(self.candidates, top_k)
+        with span("milvus.search", collection=self.collection_name, batch_size=len(vectors), limit=limit):
+            results = self.client.search(
+                collection_name=self.collection_name,
+                data=vectors,
+                limit=limit,
+                output_fields=self.output_fields,
+            ) or [[] for _ in vectors]
+        fused_hits = []
+        for query, hits in zip(queries, results):
+            dense = {hit["id"]: {"id": hit["id"], **hit["entity"]} for hit in hits}
+            with span("bm25.search", collection=self.collection_name, limit=limit):
+                lexical = [chunk_id for chunk_id, _ in self.lexical_index.search(self.collection_name, query, limit)]
+            fused = reciprocal_rank_fusion([list(dense), lexical], self.rrf_k)[:top_k]
+            # Lexical-only hits come with their text and metadata from the index
+            extra = self.lexical_index.get_chunks(self.collection_name, [chunk_id for chunk_id in fused if chunk_id not in dense])
+            fused_hits.append([dense.get(chunk_id) or extra[chunk_id] for chunk_id in fused if chunk_id in dense or chunk_id in extra])
+        return fused_hits
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by query embedding.
+
+    A lookup returns the cached answer of the most similar earlier query when
+    its cosine similarity is at least 'threshold' and the entry is younger than
+    'ttl' seconds. Entries are scoped per collection, at most 'max_entries' are
+    kept per collection (least recently used are evicted first), and a whole
+    collection can be invalidated when its contents change.
+
+    Callers may also pass a 'version' of the data behind a scope (e.g. the
+    modification time of its manifest): when it differs from the version the
+    entries were stored under, they are dropped. This catches ingestion done
+    by another process, which cannot call invalidate() on this one.
+    """
+
+    def __init__(self, threshold=0.95, ttl=3600.0, max_entries=1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._scopes = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+    def _expire(self, entries, now):
+        for key in [key for key, (_, _, created) in entries.items() if now - created > self.ttl]:
+            del entries[key]
+
+    def _check_version(self, scope, version):
+        if self._versions.get(scope, version) != version:
+            self._scopes.pop(scope, None)
+        self._versions[scope] = version
+
+    def lookup(self, scope, vector, version=None):
+        """
+        Return the cached answer for a query similar to 'vector', or None.
+        """
+        now = time.monotonic()
+        query = self._normalize(vector)
+        with self._lock:
+            self._check_version(scope, version)
+            entries = self._scopes.get(scope)
+            if not entries:
+                return None
+            self._expire(entries, now)
+            if not entries:
+                return None
+            keys = list(entries)
+            similarities = np.stack([entries[key][0] for key in keys]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            entries.move_to_end(keys[best])
+            return entries[keys[best]][1]
+
+    def store(self, scope, vector, answer, version=None):
+        with self._lock:
+            self._check_version(scope, version)
+            entries = self._scopes.setdefault(scope, OrderedDict())
+            key = object()
+            entries[key] = (self._normalize(vector), answer, time.monotonic())
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, scope):
+        with self._lock:
+            self._scopes.pop(scope, None)
+            self._versions.pop(scope, None)
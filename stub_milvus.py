@@ -0,0 +1,96 @@
+import threading
+
+import numpy as np
+
+from collection_scan import parse_id_filter
+
+# In-memory stand-in for the parts of MilvusClient this project uses, for
+# benchmarks and tests without Milvus Lite. Search is exact inner product over
+# all stored vectors; query only understands the "id > N" / "id >= N" filters
+# that collection_scan issues.
+
+
+class StubMilvusClient:
+    supports_filter_expressions = False
+
+    def __init__(self):
+        self.collections = {}
+        self._matrices = {}
+        self._lock = threading.Lock()
+
+    def has_collection(self, collection_name):
+        return collection_name in self.collections
+
+    def create_collection(self, collection_name, dimension, metric_type="IP", **kwargs):
+        if metric_type != "IP":
+            raise ValueError("The stub only supports inner-product search.")
+        with self._lock:
+            self.collections[collection_name] = {}
+            self._matrices.pop(collection_name, None)
+
+    def drop_collection(self, collection_name):
+        with self._lock:
+            self.collections.pop(collection_name, None)
+            self._matrices.pop(collection_name, None)
+
+    def upsert(self, collection_name, data):
+        with self._lock:
+            rows = self.collections[collection_name]
+            for row in data:
+                rows[row["id"]] = dict(row)
+            self._matrices.pop(collection_name, None)
+        return {"upsert_count": len(data)}
+
+    insert = upsert
+
+    def flush(self, collection_name):
+        pass
+
+    def delete(self, collection_name, ids):
+        with self._lock:
+            rows = self.collections[collection_name]
+            for row_id in ids:
+                rows.pop(row_id, None)
+            self._matrices.pop(collection_name, None)
+        return {"delete_count": len(ids)}
+
+    def _matrix(self, collection_name):
+        # Stacked vectors, rebuilt lazily after writes
+        if collection_name not in self._matrices:
+            rows = list(self.collections[collection_name].values())
+            vectors = np.array([row["vector"] for row in rows], dtype=np.float32) if rows else None
+            self._matrices[collection_name] = (rows, vectors)
+        return self._matrices[collection_name]
+
+    def search(self, collection_name, data, limit=10, output_fields=None, **kwargs):
+        with self._lock:
+            rows, vectors = self._matrix(collection_name)
+        if vectors is None:
+            return [[] for _ in data]
+        scores = np.asarray(data, dtype=np.float32) @ vectors.T
+        results = []
+        for query_scores in scores:
+            top = np.argsort(-query_scores)[:limit]
+            results.append([
+                {
+                    "id": rows[index]["id"],
+                    "distance": float(query_scores[index]),
+                    "entity": {field: rows[index].get(field) for field in output_fields or []},
+                }
+                for index in top
+            ])
+        return results
+
+    def query(self, collection_name, filter="", output_fields=None, limit=None, **kwargs):
+        matches = parse_id_filter(filter)
+        with self._lock:
+            rows = sorted(self.collections[collection_name].values(), key=lambda row: row["id"])
+        rows = [row for row in rows if matches(row["id"])]
+        fields = output_fields or ["id"]
+        return [{field: row.get(field) for field in fields} for row in rows[:limit]]
+
+    def get(self, collection_name, ids, output_fields=None, **kwargs):
+        fields = ["id", *(output_fields or [])]
+        with self._lock:
+            rows = self.collections[collection_name]
+            return [{field: rows[row_id].get(field) for field in fields} for row_id in ids if row_id in rows]
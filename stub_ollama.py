@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Ollama HTTP API, for load tests and benchmarks without
+# a model server. Embeddings are deterministic pseudo-random unit vectors derived
+# from the text, and generations are canned tokens emitted at a fixed rate.
+
+WORDS = ("the", "lecture", "explains", "how", "vectors", "model", "data", "and", "search", "results")
+
+
+def fake_embedding(text, dimension):
+    seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16)
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimension)]
+    norm = sum(value * value for value in vector) ** 0.5 or 1.0
+    return [value / norm for value in vector]
+
+
+def fake_tokens(prompt, count):
+    rng = random.Random(prompt)
+    return [f"{rng.choice(WORDS)} " for _ in range(count)]
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; with Nagle on, every response waits for a delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_json_lines(self, lines):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for line in lines:
+            data = json.dumps(line).encode("utf-8") + b"\n"
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self):
+        config = self.server.config
+        request = self._read_json()
+        model = request.get("model", "stub")
+        if self.path in ("/api/embed", "/api/embeddings"):
+            texts = request.get("input", request.get("prompt", ""))
+            texts = [texts] if isinstance(texts, str) else texts
+            time.sleep(config["embed_latency"] + config["embed_latency_per_text"] * len(texts))
+            vectors = [fake_embedding(text, config["dimension"]) for text in texts]
+            if self.path == "/api/embeddings":
+                return self._send_json({"embedding": vectors[0]})
+            return self._send_json({"model": model, "embeddings": vectors})
+        if self.path in ("/api/generate", "/api/chat"):
+            if self.path == "/api/chat":
+                prompt = json.dumps(request.get("messages", []))
+            else:
+                prompt = request.get("prompt", "")
+            return self._generate(model, prompt, request.get("stream", True), request.get("format"), chat=self.path == "/api/chat")
+        self.send_error(404)
+
+    def _generate(self, model, prompt, stream, output_format, chat):
+        config = self.server.config
+        if output_format == "json":
+            tokens = [json.dumps({"flashcards": [{"question": f"What does {word} mean?", "answer": word} for word in WORDS[:3]]})]
+        else:
+            tokens = fake_tokens(prompt, config["tokens"])
+
+        def message(token, done):
+            line = {"model": model, "created_at": datetime.now(timezone.utc).isoformat(), "done": done}
+            if chat:
+                line["message"] = {"role": "assistant", "content": token}
+            else:
+                line["response"] = token
+            return line
+
+        def lines():
+            time.sleep(config["first_token_latency"])
+            for token in tokens:
+                time.sleep(1.0 / config["token_rate"])
+                yield message(token, False)
+            yield message("", True)
+
+        if stream:
+            self._stream_json_lines(lines())
+        else:
+            for _ in lines():
+                pass
+            self._send_json(message("".join(tokens), True))
+
+
+def start_stub_server(host="127.0.0.1", port=0, dimension=1024, tokens=40, token_rate=200.0,
+                      first_token_latency=0.05, embed_latency=0.005, embed_latency_per_text=0.0005):
+    """
+    Start the stub in a background thread and return the server; its URL is
+    f"http://{host}:{server.server_port}" (point OLLAMA_HOST at it).
+    """
+    server = ThreadingHTTPServer((host, port), StubOllamaHandler)
+    server.daemon_threads = True
+    server.config = {
+        "dimension": dimension,
+        "tokens": tokens,
+        "token_rate": token_rate,
+        "first_token_latency": first_token_latency,
+        "embed_latency": embed_latency,
+        "embed_latency_per_text": embed_latency_per_text,
+    }
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Ollama API.")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--dimension", type=int, default=1024, help="Embedding dimension")
+    parser.add_argument("--tokens", type=int, default=40, help="Tokens per generation")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Tokens per second")
+    parser.add_argument("--first-token-latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--embed-latency", type=float, default=0.005, help="Seconds per embedding request")
+    args = parser.parse_args()
+    server = start_stub_server(port=args.port, dimension=args.dimension, tokens=args.tokens,
+                               token_rate=args.token_rate, first_token_latency=args.first_token_latency,
+                               embed_latency=args.embed_latency)
+    print(f"Stub Ollama listening on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
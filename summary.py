@@ -1,24 +1,28 @@
-import requests
+import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor
+from chunking import estimate_tokens, group_segments
+from llm import collect, print_token, stream_generate
+from telemetry import traced
+from transcript_store import default_transcript_path, load_segments, read_transcription_segments
 
-def make_api_call(payload):
-    url = "http://localhost:11434/api/generate"
-    headers = {
-        "Content-Type": "application/json"
-    }
+# Transcripts larger than this (in estimated tokens) are summarized with map-reduce
+SUMMARY_TOKEN_BUDGET = 3000
+
+@traced("summary.make_api_call")
+def make_api_call(payload, on_token=None):
+    """
+    Stream a generation from Ollama and return the full text. 'on_token' is
+    called with every token as it arrives (e.g. to print it right away).
+    """
+    import requests
     try:
-        full_text = ""
-        with requests.post(url, headers=headers, data=json.dumps(payload), stream=True) as response:
-            for line in response.iter_lines(decode_unicode=True):
-                if line:
-                    response_data = json.loads(line)
-                    full_text += response_data["response"]
-        return full_text                    
+        return collect(stream_generate(payload), on_token)
     except requests.RequestException as e:
         print("Error:", e)
         return None
 
-def generate_summary(text):
+def generate_summary(text, on_token=None):
     prompt = ("""
     You are a Summarizing AI. You should summarize the given content.The summary should be minimum 600 words and it can go upto 1000 words.
     Find the context/Main Factor of the text and the summarize based on it.The response should not contain any special characters it must only include numbers and text.
@@ -27,17 +31,64 @@ def generate_summary(text):
         "model": "llama3.2",
         "prompt": prompt,
     }
-    response_data = make_api_call(payload)
+    response_data = make_api_call(payload, on_token)
     return response_data
 
-def handle_summary_stream(response_text):
-    print("Summary update:", response_text)
+def summarize_chunk(chunk):
+    """
+    Map step: summarize one time range of the transcript.
+    """
+    prompt = ("""
+    You are a Summarizing AI. Summarize the following part of a longer transcript in 150 to 250 words.
+    Keep every key fact, name and number. The response should not contain any special characters it must only include numbers and text.
+    Content:""" + chunk["text"])
+    return make_api_call({"model": "llama3.2", "prompt": prompt}) or ""
+
+def _partials_to_text(partials):
+    return "\n\n".join(f"[{partial['start']} - {partial['end']}] {partial['text']}" for partial in partials)
+
+def reduce_partials(partials, token_budget, max_workers):
+    """
+    Reduce step: merge partial summaries group by group until they fit in one prompt.
+    """
+    group_budget = token_budget
+    while len(partials) > 1 and estimate_tokens(_partials_to_text(partials)) > token_budget:
+        items = [{"text": _partials_to_text([partial]), "start": partial["start"], "end": partial["end"]} for partial in partials]
+        groups = group_segments(items, group_budget)
+        if len(groups) == len(items):
+            # Every partial fills a group on its own; allow larger groups so the reduction makes progress
+            group_budget *= 2
+            continue
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            texts = list(executor.map(summarize_chunk, groups))
+        partials = [{"start": group["start"], "end": group["end"], "text": text} for group, text in zip(groups, texts)]
+    return partials
+
+def generate_summary_map_reduce(segments, token_budget=SUMMARY_TOKEN_BUDGET, max_workers=4, on_token=None):
+    """
+    Summarize a transcript that does not fit in the model context.
+
+    The segments are grouped into chunks of at most 'token_budget' tokens, the
+    chunks are summarized concurrently, and the partial summaries (each tagged
+    with its time range) are reduced into the final summary.
+
+    Returns:
+        Dictionary with the final "summary" and the "partials" it was built from.
+    """
+    chunks = group_segments(segments, token_budget)
+    print(f"Summarizing {len(chunks)} chunks with {max_workers} workers...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        texts = list(executor.map(summarize_chunk, chunks))
+    partials = [{"start": chunk["start"], "end": chunk["end"], "text": text} for chunk, text in zip(chunks, texts)]
+    reduced = reduce_partials(partials, token_budget, max_workers)
+    # Only the final pass is streamed to 'on_token'
+    summary = generate_summary(_partials_to_text(reduced), on_token)
+    return {"summary": summary, "partials": partials}
 
 # Read the transcription file and extract text
 def read_transcription_from_file(transcription_file):
     try:
-        with open(transcription_file, "r", encoding="utf-8") as file:
-            transcription_data = json.load(file)
+        transcription_data = load_segments(transcription_file)
         # Extract text from the transcription (combine all segments)
         full_text = " ".join([segment["text"] for segment in transcription_data])
         return full_text
@@ -53,17 +104,28 @@ def read_transcription_from_file(transcription_file):
 
 # Main function to combine transcription and summarization
 def main():
-    # Input file for transcription
-    transcription_file = "transcription_with_timestamps.json"
+    parser = argparse.ArgumentParser(description="Summarize a transcription with Ollama.")
+    parser.add_argument("transcription_file", nargs="?", default=None,
+                        help="Transcript store, JSON or JSON Lines file (default: the one transcript.py wrote)")
+    args = parser.parse_args()
+
+    # Input file for transcription (the columnar store when there is one)
+    transcription_file = args.transcription_file or default_transcript_path()
 
     # Read the transcription
-    transcription_text = read_transcription_from_file(transcription_file)
+    segments = read_transcription_segments(transcription_file)
 
-    if transcription_text:
+    if segments:
         print("Generating summary...")
-        # Generate the summary
-        summary_result = generate_summary(transcription_text)
-        handle_summary_stream(summary_result)
+        transcription_text = " ".join(segment["text"] for segment in segments)
+        # Tokens are printed as they arrive
+        print("Summary: ", end="", flush=True)
+        if estimate_tokens(transcription_text) <= SUMMARY_TOKEN_BUDGET:
+            generate_summary(transcription_text, on_token=print_token)
+        else:
+            # Too long for one prompt: summarize time ranges concurrently, then combine them
+            generate_summary_map_reduce(segments, on_token=print_token)
+        print()
     else:
         print("No transcription text to summarize.")
 
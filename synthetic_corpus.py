@@ -0,0 +1,112 @@
+import random
+
+# Deterministic synthetic lectures for benchmarks. Every document walks through
+# a few topics, so chapter detection has real boundaries to find, and mentions
+# names and course codes that only a keyword search matches exactly.
+
+TOPICS = {
+    "databases": ("table", "index", "query", "transaction", "B-tree", "join", "schema", "lock"),
+    "networks": ("packet", "router", "TCP", "latency", "bandwidth", "socket", "DNS", "handshake"),
+    "algorithms": ("graph", "sorting", "recursion", "heap", "complexity", "greedy", "hashing", "search"),
+    "biology": ("cell", "protein", "enzyme", "membrane", "DNA", "mitosis", "ribosome", "gene"),
+    "economics": ("market", "demand", "supply", "inflation", "price", "elasticity", "tax", "trade"),
+}
+FILLER = ("the", "a", "we", "see", "that", "this", "is", "how", "when", "then", "so", "now", "of", "in")
+NAMES = ("Ada Lovelace", "Alan Turing", "Grace Hopper", "Edsger Dijkstra", "Barbara Liskov")
+
+
+def make_sentence(rng, topic, words=12):
+    vocabulary = TOPICS[topic]
+    tokens = [rng.choice(vocabulary) if rng.random() < 0.4 else rng.choice(FILLER) for _ in range(words)]
+    if rng.random() < 0.1:
+        tokens.insert(rng.randrange(len(tokens)), rng.choice(NAMES))
+    if rng.random() < 0.1:
+        tokens.insert(rng.randrange(len(tokens)), f"{topic[:2].upper()}{rng.randint(100, 499)}")
+    return " ".join(tokens).capitalize() + "."
+
+
+def make_transcript(seed=0, segments=300, topics=4, seconds_per_segment=4):
+    """
+    Whisper-style segments ({"text", "timestamp"}) covering 'topics' topics in turn.
+    """
+    rng = random.Random(seed)
+    order = rng.sample(sorted(TOPICS), min(topics, len(TOPICS)))
+    transcript = []
+    for index in range(segments):
+        topic = order[index * len(order) // segments]
+        seconds = index * seconds_per_segment
+        transcript.append({
+            "text": make_sentence(rng, topic, words=rng.randint(6, 16)),
+            "timestamp": f"{seconds // 60}:{seconds % 60:02d}",
+        })
+    return transcript
+
+
+def make_pages(seed=0, pages=20, sentences_per_page=25, topics=4):
+    """
+    Page texts of a synthetic course handout.
+    """
+    rng = random.Random(seed)
+    order = rng.sample(sorted(TOPICS), min(topics, len(TOPICS)))
+    return [
+        " ".join(make_sentence(rng, order[page * len(order) // pages]) for _ in range(sentences_per_page))
+        for page in range(pages)
+    ]
+
+
+def make_queries(seed=0, count=50):
+    """
+    Questions about the synthetic corpus, half of them naming a person or term exactly.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for index in range(count):
+        topic = rng.choice(sorted(TOPICS))
+        if index % 2:
+            queries.append(f"What did {rng.choice(NAMES)} say about {rng.choice(TOPICS[topic])}?")
+        else:
+            queries.append(f"How does the {rng.choice(TOPICS[topic])} relate to the {rng.choice(TOPICS[topic])}?")
+    return queries
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages, line_chars=90):
+    """
+    Write 'pages' (strings) as a minimal text-only PDF that PyPDF2 can extract.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for text in pages:
+        words, lines, line = text.split(), [], ""
+        for word in words:
+            if line and len(line) + len(word) + 1 > line_chars:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        if line:
+            lines.append(line)
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_escape(item)}) Tj T*" for item in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {len(page_ids)} >>"
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as file:
+        file.write(data)
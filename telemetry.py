@@ -0,0 +1,227 @@
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lightweight spans and metrics. Off by default: span() then returns a shared
+# no-op object and trace_tokens() hands the stream back untouched, so the
+# instrumented code pays one global lookup per call.
+#
+# Enable with ZETA_TRACE_FILE=<path> (one JSON line per finished span) and/or
+# ZETA_METRICS_PORT=<port> (Prometheus text format on /metrics), or by calling
+# configure(). Worker processes inherit the environment, so their spans land in
+# the same trace file.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+_enabled = False
+_trace_file = None
+_metrics_server = None
+_lock = threading.Lock()
+_metrics = {}
+_span_ids = itertools.count(1)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """
+    Timed section of work. Attributes given up front or through set() are
+    exported with the span; "tokens" and "batch_size" also feed the metrics.
+    """
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.id = next(_span_ids)
+        self.parent = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self.id)
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.start
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # A stream span closed from another context (e.g. garbage-collected elsewhere)
+            pass
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        tokens = self.attributes.get("tokens")
+        if tokens and duration > 0:
+            self.attributes["tokens_per_sec"] = round(tokens / duration, 2)
+        _record(self, duration)
+        return False
+
+
+def span(name, **attributes):
+    """
+    Context manager timing the enclosed block as span 'name'.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def traced(name):
+    """
+    Decorator running every call of the function in a span.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with Span(name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_tokens(name, tokens, **attributes):
+    """
+    Wrap a token stream in a span that counts the tokens and records the time
+    to the first one. The span ends when the stream is exhausted or closed.
+    """
+    if not _enabled:
+        return tokens
+    return _traced_tokens(name, tokens, attributes)
+
+
+def _traced_tokens(name, tokens, attributes):
+    with Span(name, attributes) as current:
+        count = 0
+        for token in tokens:
+            if count == 0:
+                current.set(first_token_seconds=round(time.perf_counter() - current.start, 4))
+            count += 1
+            current.set(tokens=count)
+            yield token
+
+
+def _record(finished, duration):
+    with _lock:
+        metrics = _metrics.get(finished.name)
+        if metrics is None:
+            metrics = _metrics[finished.name] = {"count": 0, "seconds": 0.0, "buckets": [0] * len(BUCKETS),
+                                                 "tokens": 0, "batch_items": 0, "errors": 0}
+        metrics["count"] += 1
+        metrics["seconds"] += duration
+        for index, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                metrics["buckets"][index] += 1
+        metrics["tokens"] += finished.attributes.get("tokens", 0)
+        metrics["batch_items"] += finished.attributes.get("batch_size", 0)
+        metrics["errors"] += "error" in finished.attributes
+        if _trace_file is not None:
+            record = {
+                "name": finished.name,
+                "id": finished.id,
+                "parent": finished.parent,
+                "pid": os.getpid(),
+                "thread": threading.current_thread().name,
+                "start": finished.wall_start,
+                "duration_ms": round(duration * 1000, 3),
+                **finished.attributes,
+            }
+            _trace_file.write(json.dumps(record, default=str) + "\n")
+
+
+def render_prometheus():
+    """
+    Current metrics in the Prometheus text exposition format.
+    """
+    lines = [
+        "# HELP zeta_span_seconds Duration of instrumented spans.",
+        "# TYPE zeta_span_seconds histogram",
+    ]
+    with _lock:
+        snapshot = {name: {**metrics, "buckets": list(metrics["buckets"])} for name, metrics in _metrics.items()}
+    for name, metrics in sorted(snapshot.items()):
+        for bound, count in zip(BUCKETS, metrics["buckets"]):
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'zeta_span_seconds_bucket{{span="{name}",le="{le}"}} {count}')
+        lines.append(f'zeta_span_seconds_sum{{span="{name}"}} {metrics["seconds"]}')
+        lines.append(f'zeta_span_seconds_count{{span="{name}"}} {metrics["count"]}')
+    for metric, key, help_text in (
+        ("zeta_span_tokens_total", "tokens", "Tokens generated inside spans."),
+        ("zeta_span_batch_items_total", "batch_items", "Items processed in batched spans."),
+        ("zeta_span_errors_total", "errors", "Spans that ended with an exception."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f'{metric}{{span="{name}"}} {metrics[key]}' for name, metrics in sorted(snapshot.items()))
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        data = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def configure(trace_file=None, metrics_port=None):
+    """
+    Turn instrumentation on (or off, when neither output is given).
+    """
+    global _enabled, _trace_file, _metrics_server
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.close()
+        _trace_file = open(trace_file, "a", encoding="utf-8", buffering=1) if trace_file else None
+    if not metrics_port and _metrics_server is not None:
+        _metrics_server.shutdown()
+        _metrics_server = None
+    if metrics_port and _metrics_server is None:
+        try:
+            _metrics_server = start_metrics_server(int(metrics_port))
+            print(f"Metrics at http://127.0.0.1:{_metrics_server.server_port}/metrics")
+        except OSError:
+            # Port taken, e.g. by the parent of a worker process that inherited the environment
+            pass
+    _enabled = _trace_file is not None or _metrics_server is not None
+
+
+configure(os.environ.get("ZETA_TRACE_FILE"), os.environ.get("ZETA_METRICS_PORT"))
@@ -0,0 +1,82 @@
+import hashlib
+import json
+
+import numpy as np
+
+from bulk_ingest import bulk_ingest, checkpoint_path_for
+from collection_scan import iter_rows
+from embeddings import EmbeddingEngine
+from ingestion import IngestionManifest, ensure_collection, manifest_path_for
+from stub_milvus import StubMilvusClient
+
+DIMENSION = 16
+
+
+class HashEmbedder(EmbeddingEngine):
+    # Deterministic vectors without Ollama
+    def _embed_batch(self, texts):
+        vectors = []
+        for text in texts:
+            seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+            vector = np.random.default_rng(seed).normal(size=DIMENSION)
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
+
+
+def write_transcripts(directory, count=3):
+    directory.mkdir()
+    for index in range(count):
+        segments = [{"timestamp": f"0:{second:02d}", "start": float(second), "end": second + 1.0,
+                     "text": f"Lecture {index} sentence {second} about topic {second % 4}."} for second in range(12)]
+        (directory / f"lecture_{index}.json").write_text(json.dumps(segments), encoding="utf-8")
+    return str(directory)
+
+
+def stored_rows(client, collection_name):
+    return list(iter_rows(client, collection_name, ["doc_id"]))
+
+
+def test_rebuild_and_other_collections_are_not_skipped(tmp_path):
+    docs = write_transcripts(tmp_path / "docs")
+    db_path = str(tmp_path / "store.db")
+    checkpoint_path = checkpoint_path_for(db_path)
+    client = StubMilvusClient()
+    manifest = IngestionManifest(manifest_path_for(db_path))
+    embedder = HashEmbedder()
+
+    def ingest(collection_name, rebuild=False):
+        ensure_collection(client, collection_name, DIMENSION, manifest, rebuild=rebuild, checkpoint_path=checkpoint_path)
+        return bulk_ingest([docs], client, collection_name, embedder, manifest, checkpoint_path, workers=1)
+
+    first = ingest("c1")
+    assert first["files"] == 3
+    rows = len(stored_rows(client, "c1"))
+    assert rows > 0
+    assert ingest("c1")["skipped"] == 3
+
+    rebuilt = ingest("c1", rebuild=True)
+    assert rebuilt["files"] == 3
+    assert len(stored_rows(client, "c1")) == rows
+
+    other = ingest("c2")
+    assert other["files"] == 3
+    assert len(stored_rows(client, "c2")) == rows
+
+
+def test_stale_checkpoint_does_not_skip_files(tmp_path):
+    docs = write_transcripts(tmp_path / "docs", count=2)
+    db_path = str(tmp_path / "store.db")
+    checkpoint_path = checkpoint_path_for(db_path)
+    client = StubMilvusClient()
+    embedder = HashEmbedder()
+    manifest = IngestionManifest(manifest_path_for(db_path))
+    ensure_collection(client, "c1", DIMENSION, manifest)
+    bulk_ingest([docs], client, "c1", embedder, manifest, checkpoint_path, workers=1)
+
+    # A store and manifest that lost the collection, with the checkpoint left behind
+    client = StubMilvusClient()
+    manifest = IngestionManifest(str(tmp_path / "other.manifest.json"))
+    ensure_collection(client, "c1", DIMENSION, manifest)
+    stats = bulk_ingest([docs], client, "c1", embedder, manifest, checkpoint_path, workers=1)
+    assert stats["files"] == 2
+    assert {row["doc_id"] for row in stored_rows(client, "c1")} == set(manifest.documents("c1"))
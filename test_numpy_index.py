@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from collection_scan import iter_rows
+from numpy_index import NumpyVectorClient
+
+DIMENSION = 64
+
+
+def make_rows(count, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, DIMENSION)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [
+        {"id": 1000 + index * 3, "vector": vectors[index].tolist(), "text": f"chunk {index}", "timestamp": f"0:{index % 60:02d}"}
+        for index in range(count)
+    ]
+
+
+def brute_force(rows, queries, limit):
+    ids = np.array([row["id"] for row in rows])
+    vectors = np.array([row["vector"] for row in rows], dtype=np.float32)
+    scores = np.asarray(queries, dtype=np.float32) @ vectors.T
+    return [list(ids[np.argsort(-query_scores, kind="stable")[:limit]]) for query_scores in scores]
+
+
+@pytest.mark.parametrize("quantization", ["int8", "float16"])
+def test_round_trip_matches_brute_force(tmp_path, quantization):
+    path = str(tmp_path / "store.npvec")
+    rows = make_rows(500)
+    client = NumpyVectorClient(path, quantization=quantization)
+    client.create_collection(collection_name="docs", dimension=DIMENSION, metric_type="IP", consistency_level="Strong")
+    for start in range(0, len(rows), 64):
+        client.upsert(collection_name="docs", data=rows[start:start + 64])
+    deleted = [row["id"] for row in rows[:50:5]]
+    client.delete(collection_name="docs", ids=deleted)
+    # Replace one row in place: same id, new vector and text
+    replacement = {**make_rows(1, seed=1)[0], "id": rows[7]["id"], "text": "replaced"}
+    client.upsert(collection_name="docs", data=[replacement])
+    client.flush(collection_name="docs")
+
+    reopened = NumpyVectorClient(path)
+    assert reopened.has_collection("docs")
+    expected_rows = [replacement if row["id"] == replacement["id"] else row
+                     for row in rows if row["id"] not in deleted]
+
+    queries = np.random.default_rng(2).normal(size=(8, DIMENSION)).astype(np.float32)
+    results = reopened.search(collection_name="docs", data=queries, limit=10, output_fields=["text"])
+    expected = brute_force(expected_rows, queries, 10)
+    for hits, expected_ids in zip(results, expected):
+        assert [hit["id"] for hit in hits] == [int(row_id) for row_id in expected_ids]
+    hit = reopened.search(collection_name="docs", data=[replacement["vector"]], limit=1, output_fields=["text", "timestamp"])[0][0]
+    assert hit["id"] == replacement["id"]
+    assert hit["entity"] == {"text": "replaced", "timestamp": replacement["timestamp"]}
+
+    stored = list(iter_rows(reopened, "docs", ["text", "vector"], page_size=64))
+    assert [row["id"] for row in stored] == sorted(row["id"] for row in expected_rows)
+    by_id = {row["id"]: row for row in expected_rows}
+    assert all(row["text"] == by_id[row["id"]]["text"] for row in stored)
+    assert np.allclose(stored[0]["vector"], by_id[stored[0]["id"]]["vector"])
+
+
+def test_unflushed_writes_are_searchable_and_deletes_hide_rows(tmp_path):
+    rows = make_rows(20)
+    client = NumpyVectorClient(str(tmp_path / "store.npvec"))
+    client.create_collection(collection_name="docs", dimension=DIMENSION)
+    client.upsert(collection_name="docs", data=rows)
+    client.delete(collection_name="docs", ids=[rows[0]["id"]])
+    hits = client.search(collection_name="docs", data=[rows[0]["vector"]], limit=30)[0]
+    assert len(hits) == 19
+    assert rows[0]["id"] not in {hit["id"] for hit in hits}
+
+
+def test_query_filters(tmp_path):
+    rows = make_rows(10)
+    client = NumpyVectorClient(str(tmp_path / "store.npvec"))
+    client.create_collection(collection_name="docs", dimension=DIMENSION)
+    client.upsert(collection_name="docs", data=rows)
+    assert [row["id"] for row in client.query("docs")] == [row["id"] for row in rows]
+    assert [row["id"] for row in client.query("docs", filter=f"id > {rows[7]['id']}")] == [rows[8]["id"], rows[9]["id"]]
+    assert client.query("docs", filter="id >= 0", output_fields=["text"], limit=1) == [{"text": "chunk 0"}]
+    assert client.get("docs", ids=[rows[3]["id"], 1], output_fields=["text"]) == [{"id": rows[3]["id"], "text": "chunk 3"}]
+    with pytest.raises(NotImplementedError):
+        list(iter_rows(client, "docs", ["text"], filter="text == 'chunk 1'"))
+
+
+def test_drop_collection_persists(tmp_path):
+    path = str(tmp_path / "store.npvec")
+    client = NumpyVectorClient(path)
+    client.create_collection(collection_name="docs", dimension=DIMENSION)
+    client.upsert(collection_name="docs", data=make_rows(3))
+    client.drop_collection("docs")
+    assert not NumpyVectorClient(path).has_collection("docs")
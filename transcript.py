@@ -1,50 +1,56 @@
-import whisper
+import argparse
 import os
 import json
-from datetime import timedelta
-import torch
+import subprocess
+import numpy as np
+from registry import get_whisper_model
+from telemetry import span
+from transcript_store import DEFAULT_STORE_PATH, format_timestamp, save_transcript_store, segments_from_whisper
 
-def format_timestamp(seconds):
+# Same as whisper.audio.SAMPLE_RATE; whisper and torch are only imported when a model is loaded
+SAMPLE_RATE = 16000
+
+def load_whisper_model(model_size="base"):
     """
-    Convert seconds to a YouTube-style timestamp (e.g., 0:01, 1:23).
+    Load a Whisper model on the GPU if one is available, otherwise on the CPU.
     """
-    return str(timedelta(seconds=int(seconds))).lstrip("0:").replace("0", "", 1) if seconds else "0:00"
+    import torch
+    import whisper
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    print(f"Loading Whisper model on {device}...")
+    with span("whisper.load", model=model_size, device=device):
+        return whisper.load_model(model_size).to(device)
 
-def transcribe_audio_with_timestamps(audio_path, model_size="base"):
+def transcribe_audio_with_timestamps(audio_path, model_size="base", words=False):
     """
     Transcribe audio using OpenAI Whisper and generate YouTube-style timestamps.
 
     Parameters:
         audio_path (str): Path to the audio file.
         model_size (str): The size of the Whisper model to use (e.g., "tiny", "base", "small", "medium", "large").
+        words (bool): Keep the word-level timings of every segment.
 
     Returns:
-        List of dictionaries containing timestamps and text segments.
+        List of dictionaries with "timestamp", "start" and "end" (seconds), "text"
+        and, with 'words', a "words" list of {"word", "start", "end"}.
     """
     if not os.path.exists(audio_path):
         raise FileNotFoundError(f"The file {audio_path} does not exist.")
 
-    # Check if GPU is available and use it if possible
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    
-    # Load the Whisper model and move it to the appropriate device
-    print(f"Loading Whisper model on {device}...")
-    model = whisper.load_model(model_size).to(device)
+    # Loaded once per process and reused by later calls
+    model = get_whisper_model(model_size)
 
     # Transcribe the audio
     print("Transcribing audio...")
-    result = model.transcribe(audio_path, word_timestamps=True)
-
-    # Process segments for YouTube-style timestamps
-    segments = result.get("segments", [])
-    transcription = []
-
-    for segment in segments:
-        start_time = format_timestamp(segment["start"])
-        text = segment["text"].strip()
-        transcription.append({"timestamp": start_time, "text": text})
+    with span("whisper.transcribe", audio=audio_path, model=model_size) as current:
+        result = model.transcribe(audio_path, word_timestamps=True)
+        current.set(batch_size=len(result.get("segments", [])))
 
-    return transcription
+    # Keep numeric times next to the YouTube-style timestamps
+    return [
+        {"timestamp": format_timestamp(segment["start"]), **segment}
+        for segment in segments_from_whisper(result, words=words)
+    ]
 
 def save_transcription_to_file(transcription, output_file):
     """
@@ -55,26 +61,169 @@ def save_transcription_to_file(transcription, output_file):
         output_file (str): Path to the output JSON file.
     """
     with open(output_file, "w", encoding="utf-8") as file:
-        json.dump(transcription, file, indent=4, ensure_ascii=False)
+        json.dump(transcription, file, ensure_ascii=False, separators=(",", ":"))
     print(f"Transcription saved to {output_file}")
 
-if __name__ == "__main__":
-    # Input audio file
-    audio_file = "output_audio.wav.wav"
+def iter_audio_blocks(audio_path, start=0.0, block_seconds=10.0):
+    """
+    Decode the audio with FFmpeg as 16 kHz mono and yield float32 sample blocks,
+    starting at 'start' seconds, without loading the whole file into memory.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-ss", str(start), "-i", audio_path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-",
+    ]
+    block_bytes = int(block_seconds * SAMPLE_RATE) * 2
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) // 2 * 2], np.int16).astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+def find_silence_cut(samples, max_samples, search_samples, frame_samples=320):
+    """
+    Return the cut position (in samples) within the last 'search_samples' before
+    'max_samples' where the audio is quietest, so windows split between words.
+    """
+    search_start = max(max_samples - search_samples, 0)
+    region = samples[search_start:max_samples]
+    frame_count = len(region) // frame_samples
+    if frame_count == 0:
+        return max_samples
+    frames = region[:frame_count * frame_samples].reshape(frame_count, frame_samples)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+    return search_start + int(np.argmin(energy)) * frame_samples + frame_samples // 2
+
+def iter_audio_windows(audio_path, start=0.0, window_seconds=30.0, search_seconds=5.0):
+    """
+    Yield (start_seconds, samples) windows of at most 'window_seconds', cut at the
+    quietest point of the last 'search_seconds' of each window.
+    """
+    window_samples = int(window_seconds * SAMPLE_RATE)
+    search_samples = int(search_seconds * SAMPLE_RATE)
+    buffer = np.empty(0, dtype=np.float32)
+    position = start
+    for block in iter_audio_blocks(audio_path, start=start):
+        buffer = np.concatenate([buffer, block])
+        while len(buffer) >= window_samples:
+            cut = find_silence_cut(buffer, window_samples, search_samples)
+            yield position, buffer[:cut]
+            position += cut / SAMPLE_RATE
+            buffer = buffer[cut:]
+    if len(buffer):
+        yield position, buffer
+
+def _progress_source(audio_path, window_seconds, model_size):
+    # What a progress file belongs to; a run with different audio or settings must not resume from it
+    stat = os.stat(audio_path)
+    return {"audio": os.path.abspath(audio_path), "size": stat.st_size, "mtime": stat.st_mtime,
+            "window_seconds": window_seconds, "model_size": model_size}
+
+def _save_progress(progress_file, source, window, end, size):
+    tmp_file = f"{progress_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump({**source, "window": window, "end": end, "bytes": size}, file)
+    os.replace(tmp_file, progress_file)
+
+def transcribe_streaming(audio_path, output_file, model_size="base", window_seconds=30.0, resume=True):
+    """
+    Transcribe audio window by window and yield segments as they are ready.
 
-    # Output file for transcription
-    output_file = "transcription_with_timestamps.json"
+    The audio is split into silence-aligned windows; the segments of each window
+    are appended to 'output_file' (JSON Lines) as soon as the window is done. A
+    sidecar '<output_file>.progress' file records the last completed window, so
+    an interrupted run resumes from there when 'resume' is set. It only resumes
+    for the same audio file (path, size and modification time), window length
+    and model; otherwise the output is started over.
 
-    try:
-        # Transcribe the audio file
-        transcription = transcribe_audio_with_timestamps(audio_file, model_size="base")
+    Yields:
+        Dictionaries with "timestamp", "start", "end" (seconds) and "text".
+    """
+    if not os.path.exists(audio_path):
+        raise FileNotFoundError(f"The file {audio_path} does not exist.")
 
-        # Save the transcription to a file
-        save_transcription_to_file(transcription, output_file)
+    progress_file = f"{output_file}.progress"
+    source = _progress_source(audio_path, window_seconds, model_size)
+    window_index, start = 0, 0.0
+    progress = None
+    if resume and os.path.exists(progress_file) and os.path.exists(output_file):
+        with open(progress_file, "r", encoding="utf-8") as file:
+            progress = json.load(file)
+        if any(progress.get(key) != value for key, value in source.items()):
+            print(f"{progress_file} belongs to another audio file or settings. Starting over.")
+            progress = None
+    if progress is not None:
+        window_index, start = progress["window"] + 1, progress["end"]
+        # Drop anything written after the last completed window
+        with open(output_file, "r+b") as file:
+            file.truncate(progress["bytes"])
+        print(f"Resuming transcription from window {window_index} at {format_timestamp(start)}...")
+    else:
+        open(output_file, "wb").close()
+
+    model = get_whisper_model(model_size)
+    previous_text = ""
+    with open(output_file, "ab") as out:
+        for window_start, samples in iter_audio_windows(audio_path, start=start, window_seconds=window_seconds):
+            with span("whisper.transcribe_window", audio=audio_path, audio_seconds=len(samples) / SAMPLE_RATE):
+                result = model.transcribe(samples, word_timestamps=True, initial_prompt=previous_text or None)
+            records = [
+                {"timestamp": format_timestamp(segment["start"]), **segment}
+                for segment in segments_from_whisper(result, offset=window_start, words=False)
+            ]
+            out.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+            _save_progress(progress_file, source, window_index, window_start + len(samples) / SAMPLE_RATE, out.tell())
+            previous_text = result.get("text", "")[-200:]
+            window_index += 1
+            yield from records
+
+def read_transcription_jsonl(input_file):
+    """
+    Load a JSON Lines transcription written by transcribe_streaming.
+    """
+    with open(input_file, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe an audio file with Whisper and YouTube-style timestamps.")
+    parser.add_argument("audio_file", nargs="?", default="output_audio.wav.wav", help="Audio file to transcribe")
+    parser.add_argument("--output", default="transcription_with_timestamps.json", help="JSON file for the transcription")
+    parser.add_argument("--model", default="base", help="Whisper model size")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write segments to a JSON Lines file as each window finishes (resumable)")
+    args = parser.parse_args()
+    audio_file, output_file = args.audio_file, args.output
 
-        # Print the transcription
-        for entry in transcription:
-            print(f"[{entry['timestamp']}] {entry['text']}")
+    try:
+        if args.stream:
+            # Stream segments to a JSON Lines file as each window finishes (resumable)
+            jsonl_file = f"{os.path.splitext(output_file)[0]}.jsonl"
+            for entry in transcribe_streaming(audio_file, jsonl_file, model_size=args.model):
+                print(f"[{entry['timestamp']}] {entry['text']}")
+            save_transcript_store(DEFAULT_STORE_PATH, read_transcription_jsonl(jsonl_file))
+        else:
+            # Transcribe the audio file, keeping the word timings Whisper computes anyway
+            transcription = transcribe_audio_with_timestamps(audio_file, model_size=args.model, words=True)
+
+            # Columnar store for the other scripts, plus the JSON file for compatibility
+            save_transcript_store(DEFAULT_STORE_PATH, transcription)
+            save_transcription_to_file([{key: value for key, value in entry.items() if key != "words"} for entry in transcription], output_file)
+
+            # Print the transcription
+            for entry in transcription:
+                print(f"[{entry['timestamp']}] {entry['text']}")
 
     except Exception as e:
         print(f"An error occurred: {e}")
+
+if __name__ == "__main__":
+    main()
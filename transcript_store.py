@@ -0,0 +1,261 @@
+import json
+import os
+import struct
+import zipfile
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+# Columnar transcript store: one uncompressed .npz holding float64 segment
+# start/end seconds, the segment texts as a single UTF-8 blob plus offsets, and
+# optional word timings laid out the same way. The archive members are stored,
+# not deflated, so each .npy member is memory-mapped in place when first
+# touched, and a time range is found by binary search on the start times: a
+# multi-hour transcript opens instantly and a stage only pages in its slice.
+
+DEFAULT_STORE_PATH = "transcription.npz"
+
+
+def format_timestamp(seconds):
+    """
+    Convert seconds to a YouTube-style timestamp (e.g., 0:01, 1:23, 1:02:03).
+    """
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def parse_timestamp(timestamp):
+    """
+    Convert a YouTube-style timestamp (e.g., 0:01, 1:23, 1:02:03) back to seconds.
+    """
+    seconds = 0
+    for part in timestamp.split(":"):
+        seconds = seconds * 60 + int(part)
+    return float(seconds)
+
+
+def with_times(segments):
+    """
+    Segments with float "start"/"end" seconds and a display "timestamp". Older
+    transcripts only have the display timestamp: the start is parsed from it
+    and each segment ends where the next one starts.
+    """
+    starts = [float(segment["start"]) if "start" in segment else parse_timestamp(segment["timestamp"])
+              for segment in segments]
+    ends = starts[1:] + starts[-1:]
+    return [
+        {
+            **segment,
+            "timestamp": segment.get("timestamp", format_timestamp(start)),
+            "start": start,
+            "end": float(segment["end"]) if "end" in segment else max(start, end),
+        }
+        for segment, start, end in zip(segments, starts, ends)
+    ]
+
+
+def _pack_strings(strings):
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def segments_from_whisper(result, offset=0.0, words=True):
+    """
+    Convert a Whisper result into store segments ({"start", "end", "text", "words"}),
+    shifting all times by 'offset' seconds.
+    """
+    segments = []
+    for segment in result.get("segments", []):
+        entry = {
+            "start": offset + segment["start"],
+            "end": offset + segment["end"],
+            "text": segment["text"].strip(),
+        }
+        if words:
+            entry["words"] = [
+                {"word": word["word"].strip(), "start": offset + word["start"], "end": offset + word["end"]}
+                for word in segment.get("words", [])
+            ]
+        segments.append(entry)
+    return segments
+
+
+def save_transcript_store(path, segments):
+    """
+    Write segments ({"start", "end", "text"} plus optional "words" lists of
+    {"word", "start", "end"}) to a columnar .npz store. Segments with only a
+    display "timestamp" get their times from it.
+    """
+    segments = with_times(list(segments))
+    text_bytes, text_offsets = _pack_strings(segment["text"] for segment in segments)
+    words = [word for segment in segments for word in segment.get("words", [])]
+    word_bytes, word_offsets = _pack_strings(word["word"] for word in words)
+    segment_word_offsets = np.zeros(len(segments) + 1, dtype=np.int64)
+    np.cumsum([len(segment.get("words", [])) for segment in segments], out=segment_word_offsets[1:])
+    # Uncompressed, so every member can be memory-mapped in place
+    np.savez(
+        path,
+        starts=np.array([segment["start"] for segment in segments], dtype=np.float64),
+        ends=np.array([segment["end"] for segment in segments], dtype=np.float64),
+        text_bytes=text_bytes,
+        text_offsets=text_offsets,
+        word_starts=np.array([word["start"] for word in words], dtype=np.float64),
+        word_ends=np.array([word["end"] for word in words], dtype=np.float64),
+        word_bytes=word_bytes,
+        word_offsets=word_offsets,
+        segment_word_offsets=segment_word_offsets,
+    )
+
+
+class TranscriptStore:
+    """
+    Read-only, lazily loaded view of a transcript store.
+
+    Segments come back as {"timestamp", "start", "end", "text"} dictionaries
+    (plus "words" when asked for), the shape every other script already uses.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as archive:
+            self._members = {info.filename[:-len(".npy")]: info for info in archive.infolist()}
+        self._arrays = {}
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = self._map_member(self._members[name])
+        return self._arrays[name]
+
+    def _map_member(self, info):
+        if info.compress_type != zipfile.ZIP_STORED:
+            raise ValueError(f"{self.path}: member '{info.filename}' is compressed and cannot be memory-mapped.")
+        with open(self.path, "rb") as file:
+            # The member's data follows its local header, whose name and extra field lengths can differ
+            # from the central directory's
+            file.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", file.read(4))
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+            version = npy_format.read_magic(file)
+            read_header = npy_format.read_array_header_1_0 if version == (1, 0) else npy_format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(file)
+            offset = file.tell()
+        if not np.prod(shape, dtype=np.int64):
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                         order="F" if fortran_order else "C")
+
+    def __len__(self):
+        return len(self._array("starts"))
+
+    @property
+    def duration(self):
+        ends = self._array("ends")
+        return float(ends[-1]) if len(ends) else 0.0
+
+    def _text(self, index):
+        offsets = self._array("text_offsets")
+        return self._array("text_bytes")[offsets[index]:offsets[index + 1]].tobytes().decode("utf-8")
+
+    def _words(self, index):
+        first, last = self._array("segment_word_offsets")[index:index + 2]
+        offsets = self._array("word_offsets")
+        data = self._array("word_bytes")
+        starts, ends = self._array("word_starts"), self._array("word_ends")
+        return [
+            {
+                "word": data[offsets[word]:offsets[word + 1]].tobytes().decode("utf-8"),
+                "start": float(starts[word]),
+                "end": float(ends[word]),
+            }
+            for word in range(first, last)
+        ]
+
+    def segment(self, index, words=False):
+        start = float(self._array("starts")[index])
+        segment = {
+            "timestamp": format_timestamp(start),
+            "start": start,
+            "end": float(self._array("ends")[index]),
+            "text": self._text(index),
+        }
+        if words:
+            segment["words"] = self._words(index)
+        return segment
+
+    def index_range(self, start=None, end=None):
+        """
+        Indices (as a range) of the segments overlapping [start, end) seconds.
+        """
+        first = 0 if start is None else int(np.searchsorted(self._array("ends"), start, side="right"))
+        last = len(self) if end is None else int(np.searchsorted(self._array("starts"), end, side="left"))
+        return range(first, max(first, last))
+
+    def segments(self, start=None, end=None, words=False):
+        """
+        Segments overlapping [start, end) seconds (the whole transcript by default).
+        """
+        return [self.segment(index, words) for index in self.index_range(start, end)]
+
+    def text(self, start=None, end=None):
+        return " ".join(segment["text"] for segment in self.segments(start, end))
+
+    def export_json(self, output_file, words=False):
+        """
+        Write the transcript in the JSON format of transcription_with_timestamps.json.
+        """
+        with open(output_file, "w", encoding="utf-8") as file:
+            json.dump(self.segments(words=words), file, ensure_ascii=False, separators=(",", ":"))
+
+    def close(self):
+        # Dropping the maps unmaps the file once no returned array refers to it
+        self._arrays = {}
+
+
+def default_transcript_path(json_path="transcription_with_timestamps.json"):
+    """
+    The transcript store when transcript.py wrote one, otherwise the JSON file.
+    """
+    return DEFAULT_STORE_PATH if os.path.exists(DEFAULT_STORE_PATH) else json_path
+
+
+def load_segments(path, start=None, end=None):
+    """
+    Read transcript segments from a .npz store, a JSON file or a JSON Lines file,
+    optionally only those overlapping [start, end) seconds.
+    """
+    if path.endswith(".npz"):
+        store = TranscriptStore(path)
+        try:
+            return store.segments(start, end)
+        finally:
+            store.close()
+    with open(path, "r", encoding="utf-8") as file:
+        if path.endswith(".jsonl"):
+            segments = [json.loads(line) for line in file if line.strip()]
+        else:
+            segments = json.load(file)
+    if start is None and end is None:
+        return segments
+    # Legacy files may lack numeric times; keep those segments rather than guess
+    return [
+        segment for segment in segments
+        if "start" not in segment
+        or ((start is None or segment.get("end", segment["start"]) > start) and (end is None or segment["start"] < end))
+    ]
+
+
+def read_transcription_segments(transcription_file):
+    """
+    Load the transcription segments (with their timestamps) from the transcript
+    store or the JSON file.
+    """
+    try:
+        return load_segments(transcription_file)
+    except (OSError, ValueError) as e:
+        print(f"Could not read {transcription_file}: {e}")
+        return None
@@ -1,38 +1,167 @@
-import yt_dlp
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def download_audio(video_url, output_filename="output_audio.wav"):
+# Whisper works on 16 kHz mono; downloading straight to that saves the resampling and most of the bytes
+AUDIO_SAMPLE_RATE = 16000
+DEFAULT_OUTPUT_DIR = "downloads"
+# Extension of the file FFmpegExtractAudio writes for each codec; it is not always the codec name.
+# ("best" keeps the source format, so its extension is not known before the download.)
+AUDIO_EXTENSIONS = {
+    "wav": "wav",
+    "flac": "flac",
+    "opus": "opus",
+    "mp3": "mp3",
+    "m4a": "m4a",
+    "aac": "m4a",
+    "alac": "m4a",
+    "vorbis": "ogg",
+}
+
+
+def audio_options(output_template, codec="wav", archive=None):
     """
-    Downloads the audio of a YouTube video and saves it in WAV format.
-    
-    Args:
-        video_url (str): The URL of the YouTube video.
-        output_filename (str): The name of the output file (default: output_audio.wav).
+    yt-dlp options that extract the best audio stream as 16 kHz mono in 'codec'
+    (wav, flac, opus, mp3, ... - Whisper reads any of them through FFmpeg).
     """
     options = {
         'format': 'bestaudio/best',  # Select the best audio quality
-        'extractaudio': True,        # Extract audio only
-        'audioformat': 'wav',        # Convert audio to WAV format
-        'outtmpl': output_filename,  # Save file with the given filename
+        'outtmpl': output_template,
+        'quiet': True,
+        'noprogress': True,
         'postprocessors': [{         # Post-processing settings
             'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'wav',
+            'preferredcodec': codec,
         }],
         'postprocessor_args': [
-            '-ar', '48000',  # Set sample rate to 48kHz
-            '-ac', '2'       # Set channels to stereo
+            '-ar', str(AUDIO_SAMPLE_RATE),  # Set sample rate to 16kHz
+            '-ac', '1'                      # Set channels to mono
         ]
     }
+    if archive:
+        # IDs of finished downloads; yt-dlp skips them on later runs
+        options['download_archive'] = archive
+    return options
 
+
+def download_audio(video_url, output_filename="output_audio.wav", codec="wav"):
+    """
+    Downloads the audio of a YouTube video and saves it as 16 kHz mono audio.
+
+    Args:
+        video_url (str): The URL of the YouTube video.
+        output_filename (str): The name of the output file (default: output_audio.wav).
+        codec (str): Audio format of the output file (default: wav).
+    """
+    import yt_dlp
     try:
-        with yt_dlp.YoutubeDL(options) as ydl:
+        with yt_dlp.YoutubeDL(audio_options(output_filename, codec)) as ydl:
             print(f"Downloading audio from: {video_url}")
             ydl.download([video_url])
             print(f"Audio successfully downloaded and saved as {output_filename}")
     except Exception as e:
         print(f"An error occurred: {e}")
 
+
+def expand_urls(urls):
+    """
+    Resolve video and playlist URLs into (video id, video URL) pairs without
+    downloading anything. Duplicates are dropped.
+    """
+    import yt_dlp
+    videos = {}
+    with yt_dlp.YoutubeDL({'extract_flat': 'in_playlist', 'quiet': True}) as ydl:
+        for url in urls:
+            try:
+                info = ydl.extract_info(url, download=False)
+            except Exception as e:
+                print(f"Could not resolve {url}: {e}")
+                continue
+            for entry in info.get('entries') or [info]:
+                if entry and entry.get('id'):
+                    videos.setdefault(entry['id'], entry.get('webpage_url') or entry.get('url') or url)
+    return list(videos.items())
+
+
+def audio_path_for(video_id, output_dir=DEFAULT_OUTPUT_DIR, codec="wav"):
+    """
+    Content-derived output path: the same video always maps to the same file.
+    """
+    if codec not in AUDIO_EXTENSIONS:
+        raise ValueError(f"Unsupported codec '{codec}', expected one of {', '.join(AUDIO_EXTENSIONS)}.")
+    return os.path.join(output_dir, f"{video_id}.{AUDIO_EXTENSIONS[codec]}")
+
+
+def _download_one(video_id, video_url, output_dir, codec, archive):
+    path = audio_path_for(video_id, output_dir, codec)
+    if os.path.exists(path):
+        return path
+    # One YoutubeDL per download; instances are not meant to be shared between threads
+    import yt_dlp
+    with yt_dlp.YoutubeDL(audio_options(os.path.join(output_dir, "%(id)s.%(ext)s"), codec, archive)) as ydl:
+        ydl.download([video_url])
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{video_url} is in the archive or did not produce {path}.")
+    return path
+
+
+def download_batch(urls, output_dir=DEFAULT_OUTPUT_DIR, codec="wav", max_workers=4, archive=None):
+    """
+    Download the audio of every video in 'urls' (videos and playlists)
+    concurrently. Videos whose file exists already are skipped, and so are
+    videos listed in the download archive (default: archive.txt in 'output_dir').
+
+    Returns:
+        Dict mapping each video URL to its audio file, for the videos that are
+        available locally after the run.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    archive = archive or os.path.join(output_dir, "archive.txt")
+    videos = expand_urls(urls)
+    print(f"Downloading {len(videos)} videos with {max_workers} workers...")
+    paths = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_download_one, video_id, video_url, output_dir, codec, archive): video_url
+            for video_id, video_url in videos
+        }
+        for future in as_completed(futures):
+            video_url = futures[future]
+            try:
+                paths[video_url] = future.result()
+                print(f"Ready: {paths[video_url]}")
+            except Exception as e:
+                print(f"Failed to download {video_url}: {e}")
+    print(f"{len(paths)} of {len(videos)} videos available in {output_dir}")
+    return paths
+
+
+def read_url_list(path):
+    """
+    Read one URL per line, ignoring blank lines and '#' comments.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip() and not line.lstrip().startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download YouTube audio as 16 kHz mono for transcription.")
+    parser.add_argument("urls", nargs="*", help="Video or playlist URLs")
+    parser.add_argument("--file", help="Text file with one URL per line")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--codec", default="wav", choices=AUDIO_EXTENSIONS, help="Output audio codec")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads")
+    args = parser.parse_args()
+
+    urls = args.urls + (read_url_list(args.file) if args.file else [])
+    if urls:
+        download_batch(urls, args.output_dir, args.codec, args.workers)
+    else:
+        print("YouTube Audio Downloader")
+        video_url = input("Enter the YouTube video URL: ").strip()
+        output_filename = "output_audio.wav"
+        download_audio(video_url, output_filename)
+
+
 if __name__ == "__main__":
-    print("YouTube Audio Downloader")
-    video_url = input("Enter the YouTube video URL: ").strip()
-    output_filename = "output_audio.wav"
-    download_audio(video_url, output_filename)
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import importlib
+import sys
+
+# One entry point for the scripts: python zeta.py <command> [options].
+#
+# The module behind a command is imported only once that command is chosen,
+# and the modules import Whisper/torch, yt-dlp, PyPDF2, pymilvus, ollama and
+# tqdm inside the functions that use them. 'chat' or 'chapters' therefore never
+# load torch, and '--help' at either level returns without touching any of them.
+
+COMMANDS = {
+    "download": ("yt-downloader", "Download YouTube audio as 16 kHz mono"),
+    "transcribe": ("transcript", "Transcribe an audio file with Whisper"),
+    "ingest": ("bulk_ingest", "Ingest PDFs and transcripts into the vector store"),
+    "chat": ("rag_with_chatbotp", "Chat with the ingested documents"),
+    "summarize": ("summary", "Summarize a transcription"),
+    "flashcards": ("flash_cards", "Generate flashcards from a transcription"),
+    "chapters": ("chapter_generation", "Split an ingested lecture into chapters"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="zeta.py",
+        description="ZETA AI: lecture download, transcription, RAG chat and study aids.",
+        epilog="commands:\n" + "\n".join(f"  {name:<12}{help_text}" for name, (_, help_text) in COMMANDS.items())
+               + "\n\nRun 'zeta.py <command> --help' for the options of a command.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=COMMANDS, metavar="command", help="One of the commands below")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    module = importlib.import_module(COMMANDS[args.command][0])
+    # The command parses its own options, with usage messages naming the subcommand
+    sys.argv = [f"zeta.py {args.command}", *args.args]
+    return module.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())